@@ -0,0 +1,220 @@
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from utils import WorkerError, WorkerPool
+import env
+
+# Long-lived replacement for `python3 src/test_to_alloy.py <test>`: the translator and its grammar are loaded once,
+# and java calls of the translator are answered by Worker JVMs that stay up between tests.
+# Speaks the protocol of worker/Worker.java, with the time spent in the Alloy backend as an extra field:
+#   @@WORKER <status> <millis> <stdout-bytes> <stderr-bytes> <solver-millis>
+
+SCRIPT = os.path.join(env.ALLOY_PTX_HOME, "src/test_to_alloy.py")
+RealPopen = subprocess.Popen
+
+
+class Solver:
+    lock = threading.Lock()
+    time = 0
+    pools = {}
+    broken = set()
+
+    @staticmethod
+    def add(seconds):
+        with Solver.lock:
+            Solver.time += seconds
+
+    @staticmethod
+    def parse_java(args, kwargs):
+        # [java, <jvm options>, -cp <classpath>, <main class>, <arguments>] without shell, stdin or tabs, else None
+        if kwargs.get("shell") or kwargs.get("input") is not None or kwargs.get("stdin") is not None:
+            return None
+        if isinstance(args, (str, bytes)) or not args or os.path.basename(str(args[0])) != "java":
+            return None
+        args = [str(arg) for arg in args]
+        options = []
+        classpath = None
+        i = 1
+        while i < len(args) and args[i].startswith("-"):
+            if args[i] == "-jar":
+                return None
+            if args[i] in ["-cp", "-classpath"] and i + 1 < len(args):
+                classpath = args[i + 1]
+                i += 2
+            else:
+                options.append(args[i])
+                i += 1
+        if classpath is None or i == len(args) or args[i] == "Worker" or any("\t" in arg or "\n" in arg for arg in args):
+            return None
+        cwd = kwargs.get("cwd") or os.getcwd()
+        return (args[0], tuple(options), classpath, args[i], cwd), args[i + 1:]
+
+    @staticmethod
+    def pool(key):
+        with Solver.lock:
+            if key not in Solver.pools:
+                java, options, classpath, main, cwd = key
+                command = [java, *options, "-cp", f"{classpath}:{env.WORKER_DIR}", "Worker", main]
+                Solver.pools[key] = WorkerPool(command, 1, cwd=cwd)
+            return Solver.pools[key]
+
+
+class JvmProcess:
+    # Enough of Popen for subprocess.run, call and check_output, backed by a job of a Worker JVM
+    def __init__(self, args, execution, kwargs):
+        self.args = args
+        self.pid = None
+        self.returncode = execution.exit_code
+        self.stdin = None
+        text = kwargs.get("text") or kwargs.get("universal_newlines") or kwargs.get("encoding") is not None
+        self.stdout = self.route(execution.out, kwargs.get("stdout"), text)
+        self.stderr = self.route(execution.err, kwargs.get("stderr"), text)
+
+    @staticmethod
+    def route(data, target, text):
+        if target == subprocess.PIPE:
+            return io.StringIO(data) if text else io.BytesIO(data.encode("utf-8"))
+        if target == subprocess.DEVNULL:
+            return None
+        fd = target if isinstance(target, int) and target >= 0 else target.fileno() if target is not None else 1
+        os.write(fd, data.encode("utf-8"))
+        return None
+
+    def communicate(self, input=None, timeout=None):
+        return (self.stdout.read() if self.stdout is not None else None,
+                self.stderr.read() if self.stderr is not None else None)
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        pass
+
+    def terminate(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class TimedPopen(RealPopen):
+    # Every child process of the translator counts as solver time, java calls go to a Worker JVM where possible
+    def __new__(cls, args, *popenargs, **kwargs):
+        java = Solver.parse_java(args, kwargs) if not popenargs else None
+        if java is not None and java[0] not in Solver.broken:
+            key, arguments = java
+            start = time.monotonic()
+            try:
+                execution = Solver.pool(key).run(arguments)
+                Solver.add(time.monotonic() - start)
+                return JvmProcess(args, execution, kwargs)
+            except (WorkerError, TimeoutError):
+                # Tools that call System.exit end the worker, run them as plain processes from now on
+                Solver.broken.add(key)
+        return super().__new__(cls)
+
+    def __init__(self, *args, **kwargs):
+        self.started = time.monotonic()
+        self.counted = False
+        super().__init__(*args, **kwargs)
+
+    def count(self):
+        if self.returncode is not None and not self.counted:
+            self.counted = True
+            Solver.add(time.monotonic() - self.started)
+
+    def wait(self, timeout=None):
+        try:
+            return super().wait(timeout)
+        finally:
+            self.count()
+
+    def poll(self):
+        try:
+            return super().poll()
+        finally:
+            self.count()
+
+
+def load_translator():
+    sys.path.insert(0, os.path.dirname(SCRIPT))
+    spec = importlib.util.spec_from_file_location("test_to_alloy", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    sys.argv = [SCRIPT]
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_translator(module, args):
+    sys.argv = [SCRIPT] + args
+    try:
+        if hasattr(module, "main"):
+            module.main()
+        else:
+            # Scripts without a main function run top to bottom, the imports are cached nevertheless
+            spec = importlib.util.spec_from_file_location("__main__", SCRIPT)
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+
+def main():
+    # The protocol gets its own descriptor, stdout and stderr of the translator and its children go to files per job
+    channel = os.fdopen(os.dup(1), "wb")
+    jobs = os.fdopen(os.dup(0), "r")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    subprocess.Popen = TimedPopen
+    module = load_translator()
+    for line in jobs:
+        args = line.rstrip("\n").split("\t")
+        if not args[0]:
+            continue
+        with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            saved_err = os.dup(2)
+            os.dup2(out.fileno(), 1)
+            os.dup2(err.fileno(), 2)
+            Solver.time = 0
+            start = time.monotonic()
+            status = run_translator(module, args)
+            millis = int((time.monotonic() - start) * 1000)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(devnull, 1)
+            os.dup2(saved_err, 2)
+            os.close(saved_err)
+            out.seek(0)
+            err.seek(0)
+            stdout = out.read()
+            stderr = err.read()
+        channel.write(f"@@WORKER {status} {millis} {len(stdout)} {len(stderr)} {int(Solver.time * 1000)}\n"
+                      .encode("utf-8"))
+        channel.write(stdout)
+        channel.write(stderr)
+        channel.flush()
+    for pool in Solver.pools.values():
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
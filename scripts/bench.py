@@ -0,0 +1,49 @@
+import argparse
+import os
+import runpy
+import sys
+
+# One entry point for the scripts, the options after the command are those of the script, e.g.
+#   python3 bench.py run table7 --sweep --jobs 8
+#   python3 bench.py generate plots --max-threads 64
+#   python3 bench.py render --format svg
+#   python3 bench.py compare <baseline> <candidate>
+# The tests of every script run with the tools of the registry in utils.py, see Tool.
+
+SCRIPTS = {"table5": "generate-table-5.py", "table6": "generate-table-6.py", "table7": "generate-table-7.py",
+           "plots": "generate-plots.py"}
+# Table 6 compiles the GPUVerify kernels, the others write their benchmarks
+GENERATE = {"plots": "--generate-tests", "table6": "--compile-tests", "table7": "--generate-tests"}
+
+
+def script(name, options):
+    # The script runs as if started itself, its journal and results are named after it
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    sys.argv = [path] + options
+    sys.path.insert(0, os.path.dirname(path))
+    runpy.run_path(path, run_name="__main__")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the tests, tables and plots of the artifact")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", add_help=False, help="run the tests of a table or of the plots")
+    run.add_argument("target", choices=SCRIPTS)
+    generate = commands.add_parser("generate", add_help=False,
+                                   help="write the benchmarks of the plots or of Table 7, or compile those of Table 6")
+    generate.add_argument("target", choices=GENERATE)
+    commands.add_parser("render", add_help=False, help="draw the plots of an earlier run from the result store")
+    commands.add_parser("compare", add_help=False, help="compare two result sets")
+    args, options = parser.parse_known_args()
+    if args.command == "run":
+        script(SCRIPTS[args.target], options)
+    elif args.command == "generate":
+        script(SCRIPTS[args.target], [GENERATE[args.target]] + options)
+    elif args.command == "render":
+        script(SCRIPTS["plots"], ["--render"] + options)
+    else:
+        script("compare-results.py", options)
+
+
+if __name__ == "__main__":
+    main()
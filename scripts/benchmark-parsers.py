@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import subprocess
+import time
+import types
+
+from utils import Dat3MResult, AlloyPtxResult, AlloyVknResult, GPUVerifyResult, Utils
+
+NOISE = [
+    "[18.10.2026 12:00:00] [INFO] ProcessingManager - Program processing: #{i} events after unrolling",
+    "[18.10.2026 12:00:00] [DEBUG] RefinementSolver - Iteration {i}: #Clauses {n}, #Variables {m}",
+    "Checking assertion at line {i} of thread {n}",
+    "    at com.dat3m.dartagnan.encoding.PropertyEncoder.encode(PropertyEncoder.java:{i})",
+]
+
+VERDICTS = {
+    Dat3MResult: "#Annotations: 12\n#Stores: 340\n#Loads: 512\n#Inits: 64\n#Others: 2048\n"
+                 "Verification finished with result PASS\nTotal verification time: 1:02:03 hours\n",
+    AlloyPtxResult: "Launching Alloy...\nTest MP outcome permitted\n",
+    AlloyVknResult: "Test mp.test.gen failed\n",
+    GPUVerifyResult: "GPUVerify kernel analyser finished with 1 verified, 0 errors\n",
+}
+
+
+def generate_log(size, verdict):
+    rng = random.Random(size)
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(NOISE).format(i=rng.randrange(1 << 20), n=rng.randrange(64), m=rng.randrange(1 << 16))
+        lines.append(line + "\n")
+        length += len(line) + 1
+    # The verdict is printed last, so a parser has to scan the whole log to find it
+    return "".join(lines) + verdict
+
+
+def baseline(revision):
+    # The utils module of an earlier revision, to compare its parsers with those of the working tree
+    directory = os.path.dirname(os.path.abspath(__file__))
+    source = subprocess.run(["git", "show", f"{revision}:./utils.py"], cwd=directory, check=True,
+                            stdout=subprocess.PIPE).stdout
+    module = types.ModuleType(f"utils@{revision}")
+    module.__file__ = os.path.join(directory, "utils.py")
+    exec(compile(source, f"{revision}:utils.py", "exec"), module.__dict__)
+    return module
+
+
+def measure(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark(result_class, out, repeat):
+    lines = out.splitlines(keepends=True)
+
+    def whole():
+        result_class(0, out, "")
+
+    def streamed():
+        parser = result_class.Parser()
+        for line in lines:
+            parser.feed(line, "out")
+        result_class(0, "", "", parser=parser)
+
+    size = len(out.encode("utf-8")) / (1 << 20)
+    return [f"{size / measure(whole, repeat):.1f}", f"{size / measure(streamed, repeat):.1f}"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", dest="sizes", type=float, action="append",
+                        help="size of the synthetic logs in MB (repeatable, default 1, 8 and 32)")
+    parser.add_argument("--repeat", dest="repeat", type=int, default=5,
+                        help="runs per measurement, the fastest one is reported")
+    parser.add_argument("--baseline", dest="baseline", metavar="REVISION",
+                        help="also measure the parsers of utils.py at this git revision, e.g. HEAD~1")
+    args = parser.parse_args()
+    previous = baseline(args.baseline) if args.baseline is not None else None
+
+    table = [["Parser", "Log (MB)", "Lines", "Whole output (MB/s)", "Line by line (MB/s)"]]
+    if previous is not None:
+        table[0] += [f"{args.baseline} whole (MB/s)", f"{args.baseline} line by line (MB/s)"]
+    for size in args.sizes or [1, 8, 32]:
+        for result_class, verdict in VERDICTS.items():
+            out = generate_log(int(size * (1 << 20)), verdict)
+            row = [result_class.__name__, f"{len(out.encode('utf-8')) / (1 << 20):.1f}", len(out.splitlines())]
+            row += benchmark(result_class, out, args.repeat)
+            if previous is not None:
+                row += benchmark(getattr(previous, result_class.__name__), out, args.repeat)
+            table.append(row)
+
+    Utils.print_table("parsers.csv", table)
+
+
+if __name__ == "__main__":
+    main()
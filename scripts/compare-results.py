@@ -0,0 +1,182 @@
+import argparse
+import json
+import math
+import os
+import sys
+
+from utils import Journal, Utils
+
+DISTRIBUTIONS = {}
+
+
+class Runs:
+    # All records of one test configuration in a result set
+    def __init__(self, config):
+        self.config = config
+        self.times = []
+        self.rss = []
+        self.verdicts = []
+
+    def add(self, record):
+        status = record.get("status")
+        self.verdicts.append(record.get("result") or status)
+        if record.get("time") is not None:
+            self.times += record.get("times") or [record["time"]]
+        if record.get("peak_rss") is not None:
+            self.rss.append(record["peak_rss"])
+
+    @property
+    def verdict(self):
+        # The most frequent verdict, a flaky test shows all of them
+        verdicts = sorted(set(self.verdicts), key=lambda v: (-self.verdicts.count(v), str(v)))
+        return "/".join(map(str, verdicts))
+
+
+def load(path):
+    # A journal, or a directory of journals (e.g. the journal directory of an earlier output)
+    paths = sorted(Utils.list_files(path, ".jsonl")) if os.path.isdir(path) else [path]
+    runs = {}
+    for journal in paths:
+        with open(journal, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                key = Journal.key(record["config"])
+                if key not in runs:
+                    runs[key] = Runs(record["config"])
+                runs[key].add(record["result"])
+    return runs
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def u_distribution(n1, n2):
+    # Number of rankings of n1 + n2 distinct values for every value of U
+    if n1 == 0 or n2 == 0:
+        return [1]
+    if (n1, n2) not in DISTRIBUTIONS:
+        counts = [0] * (n1 * n2 + 1)
+        for u, count in enumerate(u_distribution(n1 - 1, n2)):
+            counts[u + n2] += count
+        for u, count in enumerate(u_distribution(n1, n2 - 1)):
+            counts[u] += count
+        DISTRIBUTIONS[(n1, n2)] = counts
+    return DISTRIBUTIONS[(n1, n2)]
+
+
+def mann_whitney(xs, ys):
+    # Two-sided p-value of the Mann-Whitney U test: exact for small samples without ties, otherwise the normal
+    # approximation with tie and continuity correction
+    n1, n2 = len(xs), len(ys)
+    values = sorted([(value, i < n1) for i, value in enumerate(xs + ys)])
+    rank_sum = 0
+    ties = []
+    i = 0
+    while i < len(values):
+        j = i
+        while j < len(values) and values[j][0] == values[i][0]:
+            j += 1
+        # Tied values share the average of their ranks
+        rank_sum += (i + j + 1) / 2 * sum([first for _, first in values[i:j]])
+        ties.append(j - i)
+        i = j
+    u = rank_sum - n1 * (n1 + 1) / 2
+    if max(ties) == 1 and n1 * n2 <= 400:
+        counts = u_distribution(n1, n2)
+        total = math.comb(n1 + n2, n1)
+        lower = sum(counts[:int(u) + 1]) / total
+        upper = sum(counts[int(u):]) / total
+        return min(1.0, 2 * min(lower, upper))
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - sum([t ** 3 - t for t in ties]) / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = max(0.0, abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return math.erfc(z / math.sqrt(2))
+
+
+def compare(before, after, args):
+    # A change in time counts if it exceeds the threshold and, with at least two runs on both sides, is significant;
+    # single runs cannot be tested and are judged by the threshold alone
+    if not before.times or not after.times or max(median(before.times), median(after.times)) < args.min_time:
+        return None, None, None
+    change = median(after.times) / max(median(before.times), 1) - 1
+    p = mann_whitney(before.times, after.times) if min(len(before.times), len(after.times)) > 1 else None
+    if abs(change) <= args.threshold or (p is not None and p >= args.alpha):
+        return change, p, None
+    return change, p, "slower" if change > 0 else "faster"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two result sets (journals of the generate scripts)")
+    parser.add_argument("baseline", help="journal or directory of journals of the baseline run")
+    parser.add_argument("candidate", help="journal or directory of journals of the run to check")
+    parser.add_argument("--threshold", dest="threshold", type=float, default=0.1,
+                        help="relative change of the median time that counts as a regression or improvement")
+    parser.add_argument("--alpha", dest="alpha", type=float, default=0.05,
+                        help="significance level of the Mann-Whitney U test on the times of repeated runs")
+    parser.add_argument("--memory-threshold", dest="memory_threshold", type=float, default=0.2,
+                        help="relative increase of the peak RSS that counts as a regression")
+    parser.add_argument("--min-time", dest="min_time", type=float, default=100,
+                        help="tests faster than this many milliseconds in both runs are not compared for time")
+    parser.add_argument("--ignore-verdicts", dest="ignore_verdicts", action="store_true",
+                        help="do not fail because of verdict changes")
+    args = parser.parse_args()
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    summary = {name: {"matched": 0, "verdicts": 0, "slower": 0, "faster": 0, "memory": 0, "ratios": []}
+               for name in Utils.suites}
+    details = [["Suite", "Tool", "Test", "Change", "Before", "After", "p"]]
+    for key in sorted(set(baseline) & set(candidate)):
+        before, after = baseline[key], candidate[key]
+        config = before.config
+        counts = summary[Utils.suite(config)]
+        counts["matched"] += 1
+        row = [Utils.suite(config), config["tool"], config["test"]]
+        if before.verdict != after.verdict:
+            counts["verdicts"] += 1
+            details.append(row + ["verdict", before.verdict, after.verdict, "-"])
+        change, p, kind = compare(before, after, args)
+        if change is not None:
+            counts["ratios"].append(1 + change)
+        if kind is not None:
+            counts[kind] += 1
+            details.append(row + [f"{kind} {change:+.0%}", f"{median(before.times):.0f}",
+                                  f"{median(after.times):.0f}", f"{p:.3f}" if p is not None else "-"])
+        if before.rss and after.rss:
+            growth = max(after.rss) / max(max(before.rss), 1) - 1
+            if growth > args.memory_threshold:
+                counts["memory"] += 1
+                details.append(row + [f"memory {growth:+.0%}", f"{max(before.rss):.0f}", f"{max(after.rss):.0f}",
+                                      "-"])
+
+    table = [["Suite", "Matched", "Verdict changes", "Slower", "Faster", "More memory", "Time change"]]
+    for name, counts in summary.items():
+        if counts["matched"] == 0:
+            continue
+        ratios = counts["ratios"]
+        # Geometric mean of the time ratios of the compared tests
+        mean = math.exp(sum([math.log(max(r, 1e-9)) for r in ratios]) / len(ratios)) - 1 if ratios else None
+        table.append([name, counts["matched"], counts["verdicts"], counts["slower"], counts["faster"],
+                      counts["memory"], f"{mean:+.1%}" if mean is not None else "-"])
+    print(f"{len(set(baseline) & set(candidate))} tests matched, {len(set(baseline) - set(candidate))} only in the "
+          f"baseline, {len(set(candidate) - set(baseline))} only in the candidate")
+    Utils.print_table("compare.csv", table)
+    Utils.print_table("compare-details.csv", details)
+
+    failures = sum([counts["slower"] + counts["memory"] + (0 if args.ignore_verdicts else counts["verdicts"])
+                    for counts in summary.values()])
+    if failures > 0:
+        print(f"{failures} regressions")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
-DAT3M_HOME = "/home/Dat3M/"
-ALLOY_PTX_HOME = "/home/mixedproxy/"
-ALLOY_VKN_HOME = "/home/Vulkan-MemoryModel/alloy/"
-GPU_VERIFY_HOME = "/home/gpuverify-release/"
-
-TEMPLATES_DIR = "/home/templates/"
-BENCHMARKS_DIR = "/home/benchmarks/"
-FILTER_DIR = "/home/filter/"
-OUTPUT_DIR = "/home/output/"
\ No newline at end of file
+import os
+
+
+def path(name, default):
+    # Every location can be moved by the environment variable of the same name, e.g. OUTPUT_DIR=/tmp/output
+    return os.path.join(os.environ.get(name, default), "")
+
+
+DAT3M_HOME = path("DAT3M_HOME", "/home/Dat3M/")
+ALLOY_PTX_HOME = path("ALLOY_PTX_HOME", "/home/mixedproxy/")
+ALLOY_VKN_HOME = path("ALLOY_VKN_HOME", "/home/Vulkan-MemoryModel/alloy/")
+ALLOY_VKN_JAR = os.environ.get("VKN_ALLOY_JAR", "org.alloytools.alloy.dist-5.0.0-20190619.101010-34.jar")
+GPU_VERIFY_HOME = path("GPU_VERIFY_HOME", "/home/gpuverify-release/")
+
+TEMPLATES_DIR = path("TEMPLATES_DIR", "/home/templates/")
+BENCHMARKS_DIR = path("BENCHMARKS_DIR", "/home/benchmarks/")
+FILTER_DIR = path("FILTER_DIR", "/home/filter/")
+WORKER_DIR = path("WORKER_DIR", "/home/worker/")
+OUTPUT_DIR = path("OUTPUT_DIR", "/home/output/")
+CACHE_DIR = path("CACHE_DIR", "/home/cache/")
@@ -1,92 +1,90 @@
 import argparse
+import inspect
+import json
+import math
 import os
-import matplotlib.pyplot as plt
 
 import env
-from utils import Utils
+from utils import Stats, Utils
 
 
-class Dat3MGenerator:
+class Generator:
+    # Subclasses yield the lines of a benchmark from generate_<pattern>, they are written to the file as they come
+    patterns = ["MP", "SB", "LB", "IRIW"]
+
+    def tasks(self, thread_range=None, patterns=None):
+        # A benchmark is written again only if the generator code or its parameters changed, see Utils.generate
+        source = inspect.getsource(Generator) + inspect.getsource(type(self)) + getattr(self, "model", "")
+        return [(self.make_path(pattern, threads), f"{source}\n{pattern}-{threads}", self.write, (pattern, threads))
+                for threads in (thread_range or range(2, self.limit)) for pattern in (patterns or self.patterns)]
+
+    def write(self, pattern, threads):
+        Utils.write_lines(self.make_path(pattern, threads), getattr(self, f"generate_{pattern.lower()}")(threads))
+
+
+class Dat3MGenerator(Generator):
     def __init__(self, model, limit):
         self.path = os.path.join(env.BENCHMARKS_DIR, "dat3m_ptx" if model == "PTX" else "dat3m_vkn")
         self.model = model
         self.limit = limit
 
-    def generate(self):
-        for pattern in ["MP", "SB", "LB", "IRIW"]:
-            os.makedirs(os.path.join(self.path, pattern), exist_ok=True)
-        for threads in range(2, self.limit, 1):
-            with open(self.make_path("MP", threads), "w") as f:
-                f.write(self.generate_mp(threads))
-            with open(self.make_path("SB", threads), "w") as f:
-                f.write(self.generate_sb(threads))
-            with open(self.make_path("LB", threads), "w") as f:
-                f.write(self.generate_lb(threads))
-            with open(self.make_path("IRIW", threads), "w") as f:
-                f.write(self.generate_iriw(threads))
-
     def make_path(self, pattern, threads):
         return os.path.join(self.path, pattern, f"{pattern}-{threads}.litmus")
 
     def generate_header(self, pattern, threads, regs, vars=None):
-        lines = []
-        lines.append(f"{self.model} {pattern}-{threads}")
-        lines.append("{")
-        lines = lines + (vars if vars is not None else [f"x{i}=0;" for i in range(threads)])
-        lines = lines + regs
-        lines.append("}")
+        yield f"{self.model} {pattern}-{threads}"
+        yield "{"
+        yield from (vars if vars is not None else [f"x{i}=0;" for i in range(threads)])
+        yield from regs
+        yield "}"
         if self.model == "PTX":
-            lines.append(" | ".join([f"P{i}@cta {i}, gpu 0" for i in range(threads)]) + " ;")
+            yield " | ".join([f"P{i}@cta {i}, gpu 0" for i in range(threads)]) + " ;"
         if self.model == "Vulkan":
-            lines.append(" | ".join([f"P{i}@sg 0, wg {i}, qf 0" for i in range(threads)]) + " ;")
-        return lines
+            yield " | ".join([f"P{i}@sg 0, wg {i}, qf 0" for i in range(threads)]) + " ;"
 
     def generate_mp(self, threads):
         regs = [f"P{i}:r{i}=0;" for i in range(1, threads)]
         regs.append(f"P{threads - 1}:r0=0;")
-        lines = self.generate_header("MP", threads, regs)
+        yield from self.generate_header("MP", threads, regs)
         if self.model == "PTX":
-            lines.append("st.weak x0, 1 | " + " | ".join([f"ld.acquire.gpu r{i}, x{i}" for i in range(1, threads)]) + " ;")
-            lines.append(" | ".join([f"st.release.gpu x{i}, 1" for i in range(1, threads)]) + " | ld.weak r0,x0 ;")
+            yield "st.weak x0, 1 | " + " | ".join([f"ld.acquire.gpu r{i}, x{i}" for i in range(1, threads)]) + " ;"
+            yield " | ".join([f"st.release.gpu x{i}, 1" for i in range(1, threads)]) + " | ld.weak r0,x0 ;"
         if self.model == "Vulkan":
-            lines.append("st.sc0 x0, 1 | " + " | ".join([f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}" for i in range(1, threads)]) + " ;")
-            lines.append(" | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(1, threads)]) + " | ld.sc0 r0,x0 ;")
-        lines.append("exists\n(" + " /\\ ".join([f"P{i}:r{i} == 1" for i in range(1, threads)]) + f" /\\ P{threads - 1}:r0 == 0)")
-        return "\n".join(lines)
+            yield "st.sc0 x0, 1 | " + " | ".join([f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}" for i in range(1, threads)]) + " ;"
+            yield " | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(1, threads)]) + " | ld.sc0 r0,x0 ;"
+        yield "exists\n(" + " /\\ ".join([f"P{i}:r{i} == 1" for i in range(1, threads)]) + f" /\\ P{threads - 1}:r0 == 0)"
 
     def generate_sb(self, threads):
         regs = [f"P{i}:r{i + 1}=0;" for i in range(threads - 1)]
         regs.append(f"P{threads - 1}:r0=0;")
-        lines = self.generate_header("SB", threads, regs)
+        yield from self.generate_header("SB", threads, regs)
         if self.model == "PTX":
-            lines.append(" | ".join([f"st.release.gpu x{i}, 1" for i in range(threads - 1)]) + f" | st.release.gpu x{threads - 1}, 1 ;")
-            lines.append(" | ".join([f"ld.acquire.gpu r{i}, x{i}" for i in range(1, threads)]) + " | ld.acquire.gpu r0, x0 ;")
+            yield " | ".join([f"st.release.gpu x{i}, 1" for i in range(threads - 1)]) + f" | st.release.gpu x{threads - 1}, 1 ;"
+            yield " | ".join([f"ld.acquire.gpu r{i}, x{i}" for i in range(1, threads)]) + " | ld.acquire.gpu r0, x0 ;"
         if self.model == "Vulkan":
-            lines.append(" | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(threads - 1)]) + f" | st.atom.rel.dv.sc0.semsc0 x{threads - 1}, 1 ;")
-            lines.append(" | ".join([f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}" for i in range(1, threads)]) + " | ld.atom.acq.dv.sc0.semsc0 r0, x0 ;")
-        lines.append("exists\n(" + " /\\ ".join([f"P{i}:r{i + 1} == 0" for i in range(threads - 1)]) + f" /\\ P{threads - 1}:r0 == 0)")
-        return "\n".join(lines)
+            yield " | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(threads - 1)]) + f" | st.atom.rel.dv.sc0.semsc0 x{threads - 1}, 1 ;"
+            yield " | ".join([f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}" for i in range(1, threads)]) + " | ld.atom.acq.dv.sc0.semsc0 r0, x0 ;"
+        yield "exists\n(" + " /\\ ".join([f"P{i}:r{i + 1} == 0" for i in range(threads - 1)]) + f" /\\ P{threads - 1}:r0 == 0)"
 
     def generate_lb(self, threads):
         regs = [f"P{i}:r{i + 1}=0;" for i in range(threads - 1)]
         regs.append(f"P{threads - 1}:r0=0;")
-        lines = self.generate_header("LB", threads, regs)
+        yield from self.generate_header("LB", threads, regs)
         if self.model == "PTX":
-            lines.append(" | ".join([f"ld.acquire.gpu r{i}, x{i}" for i in range(1, threads)]) + " | ld.acquire.gpu r0, x0 ;")
-            lines.append(" | ".join([f"st.release.gpu x{i}, 1" for i in range(threads - 1)]) + f" | st.release.gpu x{threads - 1}, 1 ;")
+            yield " | ".join([f"ld.acquire.gpu r{i}, x{i}" for i in range(1, threads)]) + " | ld.acquire.gpu r0, x0 ;"
+            yield " | ".join([f"st.release.gpu x{i}, 1" for i in range(threads - 1)]) + f" | st.release.gpu x{threads - 1}, 1 ;"
         if self.model == "Vulkan":
-            lines.append(" | ".join([f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}" for i in range(1, threads)]) + " | ld.atom.acq.dv.sc0.semsc0 r0, x0 ;")
-            lines.append(" | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(threads - 1)]) + f" | st.atom.rel.dv.sc0.semsc0 x{threads - 1}, 1 ;")
-        lines.append("exists\n(" + " /\\ ".join([f"P{i}:r{i + 1} == 1" for i in range(threads - 1)]) + f" /\\ P{threads - 1}:r0 == 1)")
-        return "\n".join(lines)
+            yield " | ".join([f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}" for i in range(1, threads)]) + " | ld.atom.acq.dv.sc0.semsc0 r0, x0 ;"
+            yield " | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(threads - 1)]) + f" | st.atom.rel.dv.sc0.semsc0 x{threads - 1}, 1 ;"
+        yield "exists\n(" + " /\\ ".join([f"P{i}:r{i + 1} == 1" for i in range(threads - 1)]) + f" /\\ P{threads - 1}:r0 == 1)"
 
     def generate_iriw(self, threads):
         half_threads = threads // 2
         vars = [f"x{i}=0;" for i in range(half_threads)]
-        regs = [f"P{i}:r{j}=0;" for i in range(half_threads, threads) for j in range(half_threads)]
-        lines = self.generate_header("IRIW", threads, regs, vars)
+        regs = (f"P{i}:r{j}=0;" for i in range(half_threads, threads) for j in range(half_threads))
+        yield from self.generate_header("IRIW", threads, regs, vars)
         if self.model == "PTX":
-            lines.append(" | ".join([f"st.release.gpu x{i}, 1" for i in range(half_threads)]) + " | " +
+            yield (" | ".join([f"st.release.gpu x{i}, 1" for i in range(half_threads)]) + " | " +
                 " | ".join([f"ld.acquire.gpu r{i}, x{i}" for i in range(half_threads)]) + " ;")
             for i in range(1, half_threads):
                 parts = [" " for _ in range(half_threads)]
@@ -95,9 +93,9 @@ class Dat3MGenerator:
                         parts.append("ld.acquire.gpu r0, x0")
                     else:
                         parts.append(f"ld.acquire.gpu r{i}, x{i}")
-                lines.append(" | ".join(parts) + " ;")
+                yield " | ".join(parts) + " ;"
         if self.model == "Vulkan":
-            lines.append(" | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(half_threads)]) + " | " +
+            yield (" | ".join([f"st.atom.rel.dv.sc0.semsc0 x{i}, 1" for i in range(half_threads)]) + " | " +
                 " | ".join([f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}" for i in range(half_threads)]) + " ;")
             for i in range(1, half_threads):
                 parts = [" " for _ in range(half_threads)]
@@ -106,31 +104,17 @@ class Dat3MGenerator:
                         parts.append("ld.atom.acq.dv.sc0.semsc0 r0, x0")
                     else:
                         parts.append(f"ld.atom.acq.dv.sc0.semsc0 r{i}, x{i}")
-                lines.append(" | ".join(parts) + " ;")
-        lines.append("exists\n(" + " /\\ ".join([f"P{i}:r{j}=={1 if (i - half_threads) == j else 0}"
+                yield " | ".join(parts) + " ;"
+        yield "exists\n(" + " /\\ ".join(f"P{i}:r{j}=={1 if (i - half_threads) == j else 0}"
                 for i in range(half_threads, threads)
-                for j in range(half_threads)]) + ")")
-        return "\n".join(lines)
+                for j in range(half_threads)) + ")"
 
 
-class AlloyPtxGenerator:
+class AlloyPtxGenerator(Generator):
     def __init__(self, limit):
         self.path = os.path.join(env.BENCHMARKS_DIR, "alloy_ptx")
         self.limit = limit
 
-    def generate(self):
-        for pattern in ["MP", "SB", "LB", "IRIW"]:
-            os.makedirs(os.path.join(self.path, pattern), exist_ok=True)
-        for threads in range(2, self.limit, 1):
-            with open(self.make_path("MP", threads), "w") as f:
-                f.write(self.generate_mp(threads))
-            with open(self.make_path("SB", threads), "w") as f:
-                f.write(self.generate_sb(threads))
-            with open(self.make_path("LB", threads), "w") as f:
-                f.write(self.generate_lb(threads))
-            with open(self.make_path("IRIW", threads), "w") as f:
-                f.write(self.generate_iriw(threads))
-
     def make_path(self, pattern, threads):
             return os.path.join(self.path, pattern, f"{pattern}-{threads}.test")
 
@@ -141,39 +125,36 @@ class AlloyPtxGenerator:
         return [f"d0.b{thread_id}.t0 {{"] + ["  " + i + ";" for i in parts] + ["}", ""]
 
     def generate_mp(self, threads):
-        lines = self.generate_header(threads)
-        lines.append("")
-        lines += self.wrap_thread(0, ["st.weak [x0], 1", "st.release.gpu [x1], 1"])
+        yield from self.generate_header(threads)
+        yield ""
+        yield from self.wrap_thread(0, ["st.weak [x0], 1", "st.release.gpu [x1], 1"])
         for i in range(1, threads - 1):
-            lines += self.wrap_thread(i, [f"ld.acquire.gpu r{i}, [x{i}] == 1", f"st.release.gpu [x{i + 1}], 1"])
-        lines += self.wrap_thread(threads - 1, [f"ld.acquire.gpu r{threads - 1}, [x{threads - 1}] == 1", "ld.weak r0, [x0]"])
-        lines.append("assert (r0 == 1) as mp_transitive;")
-        return "\n".join(lines)
+            yield from self.wrap_thread(i, [f"ld.acquire.gpu r{i}, [x{i}] == 1", f"st.release.gpu [x{i + 1}], 1"])
+        yield from self.wrap_thread(threads - 1, [f"ld.acquire.gpu r{threads - 1}, [x{threads - 1}] == 1", "ld.weak r0, [x0]"])
+        yield "assert (r0 == 1) as mp_transitive;"
 
     def generate_sb(self, threads):
-        lines = self.generate_header(threads)
-        lines.append("")
+        yield from self.generate_header(threads)
+        yield ""
         for i in range(threads - 1):
-            lines += self.wrap_thread(i, [f"st.release.gpu [x{i}], 1", f"ld.acquire.gpu r{i + 1}, [x{i + 1}] == 0"])
-        lines += self.wrap_thread(threads - 1, [f"st.release.gpu [x{threads - 1}], 1", "ld.acquire.gpu r0, [x0]"])
-        lines.append("permit (r0 == 0) as sb_transitive;")
-        return "\n".join(lines)
+            yield from self.wrap_thread(i, [f"st.release.gpu [x{i}], 1", f"ld.acquire.gpu r{i + 1}, [x{i + 1}] == 0"])
+        yield from self.wrap_thread(threads - 1, [f"st.release.gpu [x{threads - 1}], 1", "ld.acquire.gpu r0, [x0]"])
+        yield "permit (r0 == 0) as sb_transitive;"
 
     def generate_lb(self, threads):
-        lines = self.generate_header(threads)
-        lines.append("")
+        yield from self.generate_header(threads)
+        yield ""
         for i in range(threads - 1):
-            lines += self.wrap_thread(i, [f"ld.acquire.gpu r{i + 1}, [x{i + 1}] == 0", f"st.release.gpu [x{i}], 1"])
-        lines += self.wrap_thread(threads - 1, ["ld.acquire.gpu r0, [x0]", f"st.release.gpu [x{threads - 1}], 1"])
-        lines.append("permit (r0 == 0) as lb_transitive;")
-        return "\n".join(lines)
+            yield from self.wrap_thread(i, [f"ld.acquire.gpu r{i + 1}, [x{i + 1}] == 0", f"st.release.gpu [x{i}], 1"])
+        yield from self.wrap_thread(threads - 1, ["ld.acquire.gpu r0, [x0]", f"st.release.gpu [x{threads - 1}], 1"])
+        yield "permit (r0 == 0) as lb_transitive;"
 
     def generate_iriw(self, threads):
         half_threads = threads // 2
-        lines = self.generate_header(half_threads)
-        lines.append("")
+        yield from self.generate_header(half_threads)
+        yield ""
         for i in range(half_threads):
-            lines += self.wrap_thread(i, [f"st.release.gpu [x{i}], 1"])
+            yield from self.wrap_thread(i, [f"st.release.gpu [x{i}], 1"])
         reg = 0
         for i in range(half_threads, threads):
             parts = []
@@ -188,29 +169,15 @@ class AlloyPtxGenerator:
                 else:
                     parts.append(f"ld.acquire.gpu r{reg}, [x{j}] == 0")
                 reg += 1
-            lines += self.wrap_thread(i, parts)
-        lines.append(f"permit (r{reg - 1} == 0) as iriw_transitive;")
-        return "\n".join(lines)
+            yield from self.wrap_thread(i, parts)
+        yield f"permit (r{reg - 1} == 0) as iriw_transitive;"
 
 
-class AlloyVulkanGenerator:
+class AlloyVulkanGenerator(Generator):
     def __init__(self, limit):
         self.path = os.path.join(env.BENCHMARKS_DIR, "alloy_vkn")
         self.limit = limit
 
-    def generate(self):
-        for pattern in ["MP", "SB", "LB", "IRIW"]:
-            os.makedirs(os.path.join(self.path, pattern), exist_ok=True)
-        for threads in range(2, self.limit, 1):
-            with open(self.make_path("MP", threads), "w") as f:
-                f.write(self.generate_mp(threads))
-            with open(self.make_path("SB", threads), "w") as f:
-                f.write(self.generate_sb(threads))
-            with open(self.make_path("LB", threads), "w") as f:
-                f.write(self.generate_lb(threads))
-            with open(self.make_path("IRIW", threads), "w") as f:
-                f.write(self.generate_iriw(threads))
-
     def make_path(self, pattern, threads):
         return os.path.join(self.path, pattern, f"{pattern}-{threads}.test")
 
@@ -218,34 +185,28 @@ class AlloyVulkanGenerator:
         return ["NEWWG", "NEWSG", "NEWTHREAD"] + parts
 
     def generate_mp(self, threads):
-        lines = self.wrap_thread(["st.sc0 x0 = 1", "st.atom.rel.scopedev.sc0.semsc0 x1 = 1"])
+        yield from self.wrap_thread(["st.sc0 x0 = 1", "st.atom.rel.scopedev.sc0.semsc0 x1 = 1"])
         for i in range(1, threads - 1):
-            lines += self.wrap_thread([f"ld.atom.acq.scopedev.sc0.semsc0 x{i} = 1", f"st.atom.rel.scopedev.sc0.semsc0 x{i + 1} = 1"])
-        lines += self.wrap_thread([f"ld.atom.acq.scopedev.sc0.semsc0 x{threads - 1} = 1", "ld.sc0 x0 = 0"])
-        lines.append("SATISFIABLE consistent[X]")
-        return "\n".join(lines)
+            yield from self.wrap_thread([f"ld.atom.acq.scopedev.sc0.semsc0 x{i} = 1", f"st.atom.rel.scopedev.sc0.semsc0 x{i + 1} = 1"])
+        yield from self.wrap_thread([f"ld.atom.acq.scopedev.sc0.semsc0 x{threads - 1} = 1", "ld.sc0 x0 = 0"])
+        yield "SATISFIABLE consistent[X]"
 
     def generate_sb(self, threads):
-        lines = []
         for i in range(threads - 1):
-            lines += self.wrap_thread([f"st.atom.rel.scopedev.sc0.semsc0 x{i} = 1", f"ld.atom.acq.scopedev.sc0.semsc0 x{i + 1} = 0"])
-        lines += self.wrap_thread([f"st.atom.rel.scopedev.sc0.semsc0 x{threads - 1} = 1", "ld.atom.acq.scopedev.sc0.semsc0 x0 = 0"])
-        lines.append("SATISFIABLE consistent[X]")
-        return "\n".join(lines)
+            yield from self.wrap_thread([f"st.atom.rel.scopedev.sc0.semsc0 x{i} = 1", f"ld.atom.acq.scopedev.sc0.semsc0 x{i + 1} = 0"])
+        yield from self.wrap_thread([f"st.atom.rel.scopedev.sc0.semsc0 x{threads - 1} = 1", "ld.atom.acq.scopedev.sc0.semsc0 x0 = 0"])
+        yield "SATISFIABLE consistent[X]"
 
     def generate_lb(self, threads):
-        lines = []
         for i in range(threads - 1):
-            lines += self.wrap_thread([f"ld.atom.acq.scopedev.sc0.semsc0 x{i + 1} = 1", f"st.atom.rel.scopedev.sc0.semsc0 x{i} = 1"])
-        lines += self.wrap_thread(["ld.atom.acq.scopedev.sc0.semsc0 x0 = 1", f"st.atom.rel.scopedev.sc0.semsc0 x{threads - 1} = 1"])
-        lines.append("NOSOLUTION consistent[X]")
-        return "\n".join(lines)
+            yield from self.wrap_thread([f"ld.atom.acq.scopedev.sc0.semsc0 x{i + 1} = 1", f"st.atom.rel.scopedev.sc0.semsc0 x{i} = 1"])
+        yield from self.wrap_thread(["ld.atom.acq.scopedev.sc0.semsc0 x0 = 1", f"st.atom.rel.scopedev.sc0.semsc0 x{threads - 1} = 1"])
+        yield "NOSOLUTION consistent[X]"
 
     def generate_iriw(self, threads):
-        lines = []
         half_threads = threads // 2
         for i in range(half_threads):
-            lines += self.wrap_thread([f"st.atom.rel.scopedev.sc0.semsc0 x{i} = 1"])
+            yield from self.wrap_thread([f"st.atom.rel.scopedev.sc0.semsc0 x{i} = 1"])
         for i in range(half_threads, threads):
             parts = [f"ld.atom.acq.scopedev.sc0.semsc0 x{i - half_threads} = 1"]
             for j in range(1, half_threads):
@@ -253,96 +214,326 @@ class AlloyVulkanGenerator:
                     parts.append(f"ld.atom.acq.scopedev.sc0.semsc0 x0 = 0")
                 else:
                     parts.append(f"ld.atom.acq.scopedev.sc0.semsc0 x{j} = 0")
-            lines += self.wrap_thread(parts)
-        lines.append("SATISFIABLE consistent[X]")
-        return "\n".join(lines)
-
+            yield from self.wrap_thread(parts)
+        yield "SATISFIABLE consistent[X]"
 
-def print_table(pattern, thread_range, dat3m_ptx, dat3m_vkn, alloy_ptx, alloy_vkn):
-    table = [["Threads", "Dartagnan-PTX", "Alloy-PTX", "Dartagnan-Vulkan", "Alloy-Vulkan"]]
-    for threads in thread_range:
-        aly_ptx = alloy_ptx[threads] if threads in alloy_ptx else None
-        aly_vkn = alloy_vkn[threads] if threads in alloy_vkn else None
-        table.append([threads, dat3m_ptx[threads], aly_ptx, dat3m_vkn[threads], aly_vkn])
-    print(f"{pattern} Benchmarks")
-    Utils.print_table(f"{pattern}.csv", table)
 
+TOOLS = {"dat3m_ptx": "dartagnan", "dat3m_vkn": "dartagnan", "alloy_ptx": "alloy-ptx", "alloy_vkn": "alloy-vkn"}
+# Tool and model of the results of every series in the result store
+SERIES = {"dat3m_ptx": ("dartagnan", "ptx-v7.5"), "dat3m_vkn": ("dartagnan", "spirv"), "alloy_ptx": ("alloy-ptx", None),
+          "alloy_vkn": ("alloy-vkn", None)}
 
-def print_plot(pattern, thread_range, dat3m_ptx, dat3m_vkn, alloy_ptx, alloy_vkn):
-    y_dat3m_ptx = [dat3m_ptx[x] for x in thread_range]
-    y_alloy_ptx = [alloy_ptx[x] for x in thread_range if x in alloy_ptx]
-    y_dat3m_vkn = [dat3m_vkn[x] for x in thread_range]
-    y_alloy_vkn = [alloy_vkn[x] for x in thread_range if x in alloy_vkn]
 
-    plt.plot(thread_range, y_dat3m_ptx, '-o', label="Dartagnan-PTX")
-    plt.plot([x for x in alloy_ptx], y_alloy_ptx, '-x', label="Alloy-PTX")
-    plt.plot(thread_range, y_dat3m_vkn, '-o', label="Dartagnan-Vulkan")
-    plt.plot([x for x in alloy_vkn], y_alloy_vkn, '-x', label="Alloy-Vulkan")
+def print_table(pattern, thread_range, dat3m_ptx, dat3m_vkn, alloy_ptx, alloy_vkn, suffix="", stats=None):
+    # With stats (tests measured repeatedly) the times are shown as median and confidence interval
+    stats = stats or [{}] * 4
+    tools = [(dat3m_ptx, stats[0]), (alloy_ptx, stats[2]), (dat3m_vkn, stats[1]), (alloy_vkn, stats[3])]
+    table = [["Threads", "Dartagnan-PTX", "Alloy-PTX", "Dartagnan-Vulkan", "Alloy-Vulkan"]]
+    for threads in thread_range:
+        table.append([threads] + [Utils.format_time(values.get(threads), errors[threads])
+                                  if errors.get(threads) is not None else values.get(threads)
+                                  for values, errors in tools])
+    print(f"{pattern}{suffix} Benchmarks")
+    Utils.print_table(f"{pattern}{suffix}.csv", table)
+
+
+def pyplot():
+    # Imported only to draw the plots, with the headless backend
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_tool(plt, thread_range, values, errors, fmt, label):
+    xs = [x for x in thread_range if x in values]
+    ys = [values[x] for x in xs]
+    if xs and errors and all([errors.get(x) is not None for x in xs]):
+        # Error bars span the confidence interval of the median
+        yerr = [[max(0, y - errors[x].low) for x, y in zip(xs, ys)],
+                [max(0, errors[x].high - y) for x, y in zip(xs, ys)]]
+        return plt.errorbar(xs, ys, yerr=yerr, fmt=fmt, capsize=3, label=label)[0]
+    line, = plt.plot(xs, ys, fmt, label=label)
+    return line
+
+
+def print_plot(pattern, thread_range, dat3m_ptx, dat3m_vkn, alloy_ptx, alloy_vkn, suffix="", ylabel="Time (ms)",
+               curves=None, stats=None, formats=("png",)):
+    plt = pyplot()
+    stats = stats or [None] * 4
+    line_dat3m_ptx = plot_tool(plt, thread_range, dat3m_ptx, stats[0], '-o', "Dartagnan-PTX")
+    line_alloy_ptx = plot_tool(plt, thread_range, alloy_ptx, stats[2], '-x', "Alloy-PTX")
+    line_dat3m_vkn = plot_tool(plt, thread_range, dat3m_vkn, stats[1], '-o', "Dartagnan-Vulkan")
+    line_alloy_vkn = plot_tool(plt, thread_range, alloy_vkn, stats[3], '-x', "Alloy-Vulkan")
+
+    if curves is not None:
+        lines = [line_dat3m_ptx, line_dat3m_vkn, line_alloy_ptx, line_alloy_vkn]
+        for tool, curve, line in zip([dat3m_ptx, dat3m_vkn, alloy_ptx, alloy_vkn], curves, lines):
+            if curve is not None:
+                xs = list(range(min(tool), max(tool) + 1))
+                plt.plot(xs, [curve.predict(x) for x in xs], '--', color=line.get_color(), linewidth=1)
 
     plt.xlabel("Threads")
-    plt.ylabel("Time (ms)")
+    plt.ylabel(ylabel)
     plt.title(f"{pattern} Benchmarks")
     plt.legend()
     plt.yscale("log")
-    plt.savefig(os.path.join(env.OUTPUT_DIR, f"{pattern}.png"))
+    for format in formats:
+        plt.savefig(os.path.join(env.OUTPUT_DIR, f"{pattern}{suffix}.{format}"))
     plt.clf()
 
 
-def run_benchmarks(pattern, thread_range):
-    dat3m_ptx = {}
-    path = os.path.join(env.BENCHMARKS_DIR, "dat3m_ptx")
-    for threads in thread_range:
-        test = os.path.join(path, pattern, f"{pattern}-{threads}.litmus")
-        result = Utils.run_dartagnan_test(test, "ptx-v7.5", "program_spec", "ptx")
-        if result.time is None:
-            break
-        dat3m_ptx[threads] = result.time
-
-    dat3m_vkn = {}
-    path = os.path.join(env.BENCHMARKS_DIR, "dat3m_vkn")
-    for threads in thread_range:
-        test = os.path.join(path, pattern, f"{pattern}-{threads}.litmus")
-        result = Utils.run_dartagnan_test(test, "spirv", "program_spec", "vulkan")
-        if result.time is None:
-            break
-        dat3m_vkn[threads] = result.time
-
-    alloy_ptx = {}
-    path = os.path.join(env.BENCHMARKS_DIR, "alloy_ptx")
-    for threads in thread_range:
-        test = os.path.join(path, pattern, f"{pattern}-{threads}.test")
-        result = Utils.run_alloy_ptx_test(test)
-        if result.time is None:
-            break
-        alloy_ptx[threads] = result.time
-
-    alloy_vkn = {}
-    path = os.path.join(env.BENCHMARKS_DIR, "alloy_vkn")
-    for threads in thread_range:
-        test = os.path.join(path, pattern, f"{pattern}-{threads}.test")
-        result = Utils.run_alloy_vkn_test(test)
-        if result.time is None:
+def series(pattern, field, truncate=False):
+    # The values of the completed runs of a pattern in this run by thread count, one dict per tool in the order of
+    # TOOLS. With truncate a series ends before its first thread count that ran out of memory or time.
+    rows = Utils.store.query(f"""
+        SELECT tool, model, threads, {field} AS value FROM this_run AS r
+        WHERE suite = 'Scaling' AND pattern = ? AND time IS NOT NULL AND (NOT ? OR threads < COALESCE(
+            (SELECT MIN(threads) FROM this_run AS f WHERE f.suite = r.suite AND f.pattern = r.pattern AND
+             f.tool = r.tool AND f.model IS r.model AND f.time IS NULL), threads + 1))
+        ORDER BY threads""", pattern, truncate)
+    values = []
+    for tool in TOOLS:
+        selected = {row["threads"]: row["value"] for row in rows if (row["tool"], row["model"]) == SERIES[tool]}
+        if field == "times":
+            # Tests measured repeatedly, see --repeat
+            samples = {threads: json.loads(times) if times is not None else [] for threads, times in selected.items()}
+            selected = {threads: Stats(times) if len(times) > 1 else None for threads, times in samples.items()}
+        values.append({threads: round(value, 1) if isinstance(value, float) else value
+                       for threads, value in selected.items()})
+    return values
+
+
+def render(benchmarks, formats, fit=False):
+    # Tables and plots of every pattern from the result store. Without fit (the full range) a series ends at the first
+    # thread count that ran out of memory or time, with fit (the adaptive sweep) it has all points that completed and
+    # the fitted growth curve. The plots are drawn in parallel, one process each.
+    plots = []
+    curves = {}
+    for pattern, thread_range in benchmarks.items():
+        times = series(pattern, "time", truncate=not fit)
+        stats = series(pattern, "times", truncate=not fit)
+        # Memory is what ends the sweeps, track how close each tool gets
+        memory = series(pattern, "peak_rss", truncate=not fit)
+        if fit:
+            thread_range = sorted({threads for points in times for threads in points})
+            curves[pattern] = [Curve.fit(points) for points in times]
+        print_table(pattern, thread_range, *times, stats=stats)
+        print_table(pattern, thread_range, *memory, suffix="-memory")
+        plots.append(((pattern, thread_range, *times), {"curves": curves.get(pattern), "stats": stats}))
+        plots.append(((pattern, thread_range, *memory), {"suffix": "-memory", "ylabel": "Peak RSS (MB)"}))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(len(plots), os.cpu_count())) as pool:
+        for future in [pool.submit(print_plot, *args, **kwargs, formats=formats) for args, kwargs in plots]:
+            future.result()
+    return curves
+
+
+def make_job(tool, pattern, threads):
+    path = os.path.join(env.BENCHMARKS_DIR, tool, pattern)
+    if tool == "dat3m_ptx":
+        return Utils.job("dartagnan", os.path.join(path, f"{pattern}-{threads}.litmus"),
+                         "ptx-v7.5", "program_spec", "ptx")
+    if tool == "dat3m_vkn":
+        return Utils.job("dartagnan", os.path.join(path, f"{pattern}-{threads}.litmus"),
+                         "spirv", "program_spec", "vulkan")
+    if tool == "alloy_ptx":
+        return Utils.job("alloy-ptx", os.path.join(path, f"{pattern}-{threads}.test"))
+    return Utils.job("alloy-vkn", os.path.join(path, f"{pattern}-{threads}.test"))
+
+
+def run_benchmarks(benchmarks, formats):
+    groups = {(pattern, tool): [make_job(tool, pattern, threads) for threads in thread_range]
+              for pattern, thread_range in benchmarks.items() for tool in TOOLS}
+    Utils.prepare_alloy_vkn_tests([job.args[0] for pattern in benchmarks for job in groups[(pattern, "alloy_vkn")]])
+
+    # Each sweep stops at the first thread count that runs out of memory or time
+    Utils.run_jobs(groups, stop=lambda result: result.time is None)
+
+    render(benchmarks, formats)
+
+
+class Curve:
+    # Least-squares fit of log(time), against n for exponential and against log(n) for polynomial growth
+    def __init__(self, model, a, b, error):
+        self.model = model
+        self.a = a
+        self.b = b
+        self.error = error
+
+    @staticmethod
+    def fit(points):
+        if len(points) < 3:
+            return None
+        ys = [math.log(max(y, 1)) for y in points.values()]
+        best = None
+        for model, xs in [("exponential", list(points)), ("polynomial", [math.log(x) for x in points])]:
+            mean_x = sum(xs) / len(xs)
+            mean_y = sum(ys) / len(ys)
+            sxx = sum((x - mean_x) ** 2 for x in xs)
+            b = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sxx
+            a = mean_y - b * mean_x
+            error = sum((y - a - b * x) ** 2 for x, y in zip(xs, ys))
+            if best is None or error < best.error:
+                best = Curve(model, a, b, error)
+        return best
+
+    def predict(self, threads):
+        if self.model == "exponential":
+            return math.exp(self.a + self.b * threads)
+        return math.exp(self.a) * threads ** self.b
+
+    def __str__(self):
+        if self.model == "exponential":
+            return f"{math.exp(self.a):.3g} * {math.exp(self.b):.3g}^n"
+        return f"{math.exp(self.a):.3g} * n^{self.b:.2f}"
+
+
+class Sweep:
+    # Doubles the thread count until a run fails or exceeds its budget, bisects the gap to the first failure and
+    # then adds points where the log-slope of the time curve changes
+    def __init__(self, start, step, maximum, time_budget, memory_limit, max_points):
+        self.start = start
+        self.step = step
+        self.maximum = maximum
+        self.time_budget = time_budget
+        self.memory_limit = memory_limit
+        self.max_points = max_points
+        self.results = {}
+        self.limit = None
+        self.failed = None
+
+    def align(self, threads):
+        return self.start + (min(threads, self.maximum) - self.start) // self.step * self.step
+
+    def over_budget(self, result):
+        return (result.time is None or
+                (self.time_budget is not None and result.time > self.time_budget * 1000) or
+                (self.memory_limit is not None and result.peak_rss is not None and result.peak_rss > self.memory_limit))
+
+    def add(self, threads, result):
+        self.results[threads] = result
+        if self.over_budget(result):
+            self.failed = threads if self.failed is None else min(self.failed, threads)
+        elif threads < (self.failed or math.inf):
+            self.limit = threads if self.limit is None else max(self.limit, threads)
+
+    def next(self):
+        if not self.results:
+            return [self.start]
+        if self.limit is None:
+            return []
+        if self.failed is None and self.limit + self.step <= self.maximum:
+            return [max(self.align(self.limit * 2), self.limit + self.step)]
+        if self.failed is not None and self.failed - self.limit > self.step:
+            return [self.align(self.limit + (self.failed - self.limit) // 2)]
+        return self.refine()
+
+    def refine(self):
+        points = sorted(self.points().items())
+        budget = self.max_points - len(self.results)
+        gaps = []
+        for (a, ta), (b, tb), (c, tc) in zip(points, points[1:], points[2:]):
+            left = (math.log(max(tb, 1)) - math.log(max(ta, 1))) / (b - a)
+            right = (math.log(max(tc, 1)) - math.log(max(tb, 1))) / (c - b)
+            # Timing noise on flat curves is not a change of growth, hence the absolute floor of 5% per thread
+            if abs(right - left) > max(0.25 * max(abs(left), abs(right)), 0.05):
+                gaps.append((a, b) if b - a > c - b else (b, c))
+        candidates = sorted({self.align(lo + (hi - lo) // 2) for lo, hi in gaps if hi - lo > self.step})
+        return [threads for threads in candidates if threads not in self.results][:max(budget, 0)]
+
+    def points(self):
+        return {threads: result.time for threads, result in sorted(self.results.items()) if result.time is not None}
+
+
+def run_adaptive_benchmarks(benchmarks, maximum, time_budgets, memory_limits, max_points, formats):
+    generators = {"dat3m_ptx": Dat3MGenerator("PTX", maximum + 1), "dat3m_vkn": Dat3MGenerator("Vulkan", maximum + 1),
+                  "alloy_ptx": AlloyPtxGenerator(maximum + 1), "alloy_vkn": AlloyVulkanGenerator(maximum + 1)}
+    sweeps = {(pattern, tool): Sweep(thread_range.start, thread_range.step, maximum,
+                                     Utils.limit(time_budgets, TOOLS[tool]), Utils.limit(memory_limits, TOOLS[tool]),
+                                     max_points)
+              for pattern, thread_range in benchmarks.items() for tool in TOOLS}
+
+    rounds = 0
+    wall = 0
+    while True:
+        # All sweeps advance together, the points of one round run concurrently
+        points = {key: sweep.next() for key, sweep in sweeps.items()}
+        points = {key: thread_counts for key, thread_counts in points.items() if thread_counts}
+        if not points:
             break
-        alloy_vkn[threads] = result.time
-
-    print_table(pattern, thread_range, dat3m_ptx, dat3m_vkn, alloy_ptx, alloy_vkn)
-    print_plot(pattern, thread_range, dat3m_ptx, dat3m_vkn, alloy_ptx, alloy_vkn)
+        groups = {}
+        tasks = []
+        for (pattern, tool), thread_counts in points.items():
+            tasks += generators[tool].tasks(thread_counts, [pattern])
+            for threads in thread_counts:
+                groups[(pattern, tool, threads)] = [make_job(tool, pattern, threads)]
+        Utils.generate(tasks)
+        results = Utils.executor.run(groups)
+        for (pattern, tool, threads), [result] in results.items():
+            sweeps[(pattern, tool)].add(threads, result)
+        rounds += 1
+        wall += Utils.executor.wall
+    runs = sum([len(sweep.results) for sweep in sweeps.values()])
+    print(f"Adaptive sweep: {runs} tests in {rounds} rounds on {Utils.executor.jobs} jobs: wall-clock time {wall:.0f} ms")
+
+    curves = render(benchmarks, formats, fit=True)
+    for pattern in benchmarks:
+        tools = [sweeps[(pattern, tool)] for tool in ["dat3m_ptx", "dat3m_vkn", "alloy_ptx", "alloy_vkn"]]
+        table = [["Tool", "Limit", "First failing", "Runs", "Model", "Curve"]]
+        for name, sweep, curve in zip(["Dartagnan-PTX", "Dartagnan-Vulkan", "Alloy-PTX", "Alloy-Vulkan"], tools,
+                                      curves[pattern]):
+            table.append([name, sweep.limit, sweep.failed, len(sweep.results),
+                          curve.model if curve is not None else None, curve])
+        Utils.print_table(f"{pattern}-fit.csv", table)
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--generate-tests", dest="generate", action="store_true")
+    parser.add_argument("--adaptive", dest="adaptive", action="store_true",
+                        help="probe thread counts by doubling and bisection instead of running the full range")
+    parser.add_argument("--max-threads", dest="max_threads", type=int,
+                        help="largest thread count generated (default 40) or of the adaptive sweep (default 128, "
+                             "missing tests are generated)")
+    parser.add_argument("--time-budget", dest="time_budgets", action="append", default=[], metavar="[TOOL=]SECONDS",
+                        help="adaptive sweep: a run slower than this ends the sweep of the tool (repeatable)")
+    parser.add_argument("--memory-limit", dest="memory_limits", action="append", default=[], metavar="[TOOL=]MB",
+                        help="adaptive sweep: a run with a larger peak RSS ends the sweep of the tool (repeatable)")
+    parser.add_argument("--render", dest="render", nargs="?", const="", metavar="RUN",
+                        help="only draw the tables and plots of an earlier run (default the last) from the result "
+                             "store, with --adaptive those of an adaptive sweep")
+    parser.add_argument("--format", dest="formats", action="append", choices=["png", "svg", "pdf"],
+                        help="file format of the plots (repeatable, default png)")
+    parser.add_argument("--max-points", dest="max_points", type=int, default=12,
+                        help="adaptive sweep: most thread counts run per pattern and tool")
+    Utils.add_arguments(parser)
     args = parser.parse_args()
+    Utils.configure(args, tools=not (args.generate or args.render is not None))
+    benchmarks = {
+        "SB": range(2, 41, 2),
+        "MP": range(2, 41, 2),
+        "LB": range(2, 41, 2),
+        "IRIW": range(4, 41, 2),
+    }
+    formats = args.formats or ["png"]
     if args.generate:
-        Dat3MGenerator("PTX", 41).generate()
-        Dat3MGenerator("Vulkan", 41).generate()
-        AlloyPtxGenerator(41).generate()
-        AlloyVulkanGenerator(41).generate()
+        limit = (args.max_threads or 40) + 1
+        Utils.generate(Dat3MGenerator("PTX", limit).tasks() + Dat3MGenerator("Vulkan", limit).tasks() +
+                       AlloyPtxGenerator(limit).tasks() + AlloyVulkanGenerator(limit).tasks())
+    elif args.render is not None:
+        print(f"Rendering {Utils.open_store().select(args.render or None)}")
+        render(benchmarks, formats, fit=args.adaptive)
+    elif args.adaptive:
+        time_budgets = Utils.parse_limits(args.time_budgets)
+        # Runs far beyond the budget only cost time, stop them at twice the budget unless --timeout says otherwise
+        for tool, seconds in time_budgets.items():
+            if Utils.limit(Utils.timeouts, tool) is None:
+                Utils.timeouts[tool] = 2 * seconds
+        run_adaptive_benchmarks(benchmarks, args.max_threads or 128, time_budgets,
+                                Utils.parse_limits(args.memory_limits), args.max_points, formats)
     else:
-        run_benchmarks("SB", range(2, 41, 2))
-        run_benchmarks("MP", range(2, 41, 2))
-        run_benchmarks("LB", range(2, 41, 2))
-        run_benchmarks("IRIW", range(4, 41, 2))
+        run_benchmarks(benchmarks, formats)
 
 
 if __name__ == "__main__":
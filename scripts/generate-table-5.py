@@ -1,31 +1,42 @@
+import argparse
 import os
 
 import env
-from utils import Utils
-
-
-def run_dartagnan_tests(path, cat, property, target):
-    with open(os.path.join("/home/Dat3M/dartagnan/src/test/resources/", path), "r") as f:
-        lines = (line.rstrip() for line in f)
-        tests = [line.split(",")[0] for line in lines if line]
-    time = sum([Utils.run_dartagnan_test(test, cat, property, target).time for test in tests])
-    return time, len(tests)
-
-
-def run_ptx_alloy_tests():
-    tests = Utils.list_files(os.path.join(env.ALLOY_PTX_HOME, "tests"), ".test")
-    time = 0
-    count = 0
-    for test in tests:
-        result = Utils.run_alloy_ptx_test(test)
-        time += result.time
-        count += result.out.count("Launching Alloy...")
-    return time, count
-
-
-def run_vulkan_alloy_tests():
-    tests = Utils.list_files(os.path.join(env.ALLOY_VKN_HOME, "tests"), ".test")
-    time = sum([Utils.run_alloy_vkn_test(test).time for test in tests])
+from utils import ResultStore, Utils
+
+# The lists of expected results of dartagnan with the model, property and target they are run with, and the tests of
+# the Alloy models, see Utils.tests
+GROUPS = {path: {"tool": "dartagnan", "expected": path, "args": args} for path, *args in [
+    ("PTXv6_0-expected.csv", "ptx-v6.0", "program_spec", "ptx"),
+    ("PTXv7_5-expected.csv", "ptx-v7.5", "program_spec", "ptx"),
+    ("PTXv6_0-Liveness-expected.csv", "ptx-v6.0", "liveness", "ptx"),
+    ("PTXv7_5-Liveness-expected.csv", "ptx-v7.5", "liveness", "ptx"),
+    ("VULKAN-expected.csv", "spirv", "program_spec", "vulkan"),
+    ("VULKAN-NOCHAINS-expected.csv", "spirv-nochains", "program_spec", "vulkan"),
+    ("VULKAN-Liveness-expected.csv", "spirv", "liveness", "vulkan"),
+    ("VULKAN-DR-expected.csv", "spirv", "cat_spec", "vulkan"),
+    ("VULKAN-DR-NOCHAINS-expected.csv", "spirv-nochains", "cat_spec", "vulkan"),
+]}
+GROUPS["alloy-ptx"] = {"tool": "alloy-ptx", "files": [os.path.join(env.ALLOY_PTX_HOME, "tests"), ".test"]}
+GROUPS["alloy-vulkan"] = {"tool": "alloy-vkn", "files": [os.path.join(env.ALLOY_VKN_HOME, "tests"), ".test"]}
+
+
+def usage(summary):
+    # Time in the solver: the verification time of dartagnan, the Alloy backend of pooled mixedproxy runs
+    solver = f"{summary['solver']:.0f}" if summary["solver"] is not None else "-"
+    return [solver, f"{summary['cpu']:.0f}", f"{summary['peak_rss']:.0f}"]
+
+
+def timing(summary, size):
+    # Median and confidence interval of the total when the tests were measured repeatedly, see --repeat. The time
+    # only sums completed runs, size is the number of completed tests (or Alloy checks) it is shared by.
+    stats = summary["stats"]
+    size = max(size, 1)
+    return [Utils.format_time(summary["time"], stats),
+            Utils.format_time(summary["time"] / size, stats.scale(1 / size) if stats is not None else None)]
+
+
+def vulkan_alloy_checks(tests):
     safety_check = 0
     dr_check = 0
     for file in tests:
@@ -37,70 +48,56 @@ def run_vulkan_alloy_tests():
                     dr_check += 1
                 elif "NOSOLUTION" in line or "SATISFIABLE" in line:
                     safety_check += 1
-    return time, safety_check, dr_check
+    return safety_check, dr_check
 
 
 def main():
-    # Run Alloy Dat3M
-    dat3m_ptx60_safety_time, dat3m_ptx60_safety_size = run_dartagnan_tests(
-        "PTXv6_0-expected.csv", "ptx-v6.0", "program_spec", "ptx")
-    dat3m_ptx75_safety_time, dat3m_ptx75_safety_size = run_dartagnan_tests(
-        "PTXv7_5-expected.csv", "ptx-v7.5", "program_spec", "ptx")
-    dat3m_ptx60_liveness_time, dat3m_ptx60_liveness_size = run_dartagnan_tests(
-        "PTXv6_0-Liveness-expected.csv", "ptx-v6.0", "liveness", "ptx")
-    dat3m_ptx75_liveness_time, dat3m_ptx75_liveness_size = run_dartagnan_tests(
-        "PTXv7_5-Liveness-expected.csv", "ptx-v7.5", "liveness", "ptx")
-
-    dat3m_ptx60_total_size = dat3m_ptx60_safety_size + dat3m_ptx60_liveness_size
-    dat3m_ptx60_total_time = dat3m_ptx60_safety_time + dat3m_ptx60_liveness_time
-    dat3m_ptx60_total_average = dat3m_ptx60_total_time / dat3m_ptx60_total_size
-    dat3m_ptx75_total_size = dat3m_ptx75_safety_size + dat3m_ptx75_liveness_size
-    dat3m_ptx75_total_time = dat3m_ptx75_safety_time + dat3m_ptx75_liveness_time
-    dat3m_ptx75_total_average = dat3m_ptx75_total_time / dat3m_ptx75_total_size
-
-    dat3m_vkn_safety_time, dat3m_vkn_safety_size = run_dartagnan_tests(
-        "VULKAN-expected.csv", "spirv", "program_spec", "vulkan")
-    dat3m_vkn_safety_time_nochains, dat3m_vkn_safety_size_nochains = run_dartagnan_tests(
-        "VULKAN-NOCHAINS-expected.csv", "spirv-nochains", "program_spec", "vulkan")
-    dat3m_vkn_liveness_time, dat3m_vkn_liveness_size = run_dartagnan_tests(
-        "VULKAN-Liveness-expected.csv", "spirv", "liveness", "vulkan")
-    dat3m_vkn_dr_time, dat3m_vkn_dr_size = run_dartagnan_tests(
-        "VULKAN-DR-expected.csv", "spirv", "cat_spec", "vulkan")
-    dat3m_vkn_dr_time_nochains, dat3m_vkn_dr_size_nochains = run_dartagnan_tests(
-        "VULKAN-DR-NOCHAINS-expected.csv", "spirv-nochains", "cat_spec", "vulkan")
-
-    dat3m_vkn_safety_time += dat3m_vkn_safety_time_nochains
-    dat3m_vkn_safety_size += dat3m_vkn_safety_size_nochains
-    dat3m_vkn_dr_time += dat3m_vkn_dr_time_nochains
-    dat3m_vkn_dr_size += dat3m_vkn_dr_size_nochains
-
-    dat3m_vkn_total_size = dat3m_vkn_safety_size + dat3m_vkn_liveness_size + dat3m_vkn_dr_size
-    dat3m_vkn_total_time = dat3m_vkn_safety_time + dat3m_vkn_liveness_time + dat3m_vkn_dr_time
-    dat3m_vkn_total_average = dat3m_vkn_total_time / dat3m_vkn_total_size
-
-    # Run Alloy PTX
-    alloy_ptx75_total_time, alloy_ptx75_safety_size = run_ptx_alloy_tests()
-    alloy_ptx75_total_size = alloy_ptx75_safety_size
-    alloy_ptx75_total_average = alloy_ptx75_total_time / alloy_ptx75_total_size
-
-    # Run Alloy Vulkan
-    alloy_vkn_total_time, alloy_vkn_safety_size, alloy_vkn_dr_size = run_vulkan_alloy_tests()
-    alloy_vkn_total_size = alloy_vkn_safety_size + alloy_vkn_dr_size
-    alloy_vkn_total_average = alloy_vkn_total_time / alloy_vkn_total_size
-
+    parser = argparse.ArgumentParser()
+    Utils.add_arguments(parser)
+    Utils.configure(parser.parse_args())
+
+    groups = Utils.jobs(GROUPS)
+    vulkan_alloy_tests = [job.args[0] for job in groups["alloy-vulkan"]]
+    Utils.prepare_alloy_vkn_tests(vulkan_alloy_tests)
+    Utils.run_jobs(groups)
+    completed = {row["test"] for row in Utils.store.query(
+        "SELECT test FROM this_run WHERE tool = 'alloy-vkn' AND time IS NOT NULL")}
+
+    # Every list of expected results is one model and property of dartagnan
+    lists = Utils.store.summary(["tool", "model", "property"])
+    for path, group in GROUPS.items():
+        if group["tool"] == "dartagnan":
+            cat, property, _ = group["args"]
+            Utils.print_times(path, lists.get(("dartagnan", cat, property), ResultStore.empty))
+
+    # Safety, liveness and data-race freedom are the properties program_spec, liveness and cat_spec
+    properties = Utils.store.summary(["tool", "suite", "property"])
+    totals = Utils.store.summary(["tool", "suite"])
+
+    def count(tool, suite, property):
+        return properties.get((tool, suite, property), ResultStore.empty)["tests"]
+
+    def dartagnan_row(suite):
+        total = totals.get(("dartagnan", suite), ResultStore.empty)
+        return (["\\dartagnan", suite, count("dartagnan", suite, "program_spec"), count("dartagnan", suite, "liveness"),
+                 count("dartagnan", suite, "cat_spec"), total["tests"]] + timing(total, total["completed"]) + usage(total))
+
+    # A test of mixedproxy may launch several Alloy checks
+    alloy_ptx = totals.get(("alloy-ptx", "PTX7.5"), ResultStore.empty)
+    alloy_vkn = totals.get(("alloy-vkn", "Vulkan"), ResultStore.empty)
+    alloy_vkn_safety, alloy_vkn_dr = vulkan_alloy_checks(vulkan_alloy_tests)
+    alloy_vkn_completed = sum(vulkan_alloy_checks([test for test in vulkan_alloy_tests if test in completed]))
     table = [
-        ["Tool", "Model", "Safety", "Liveness", "DRF", "Total", "Time", "Time/Tests"],
-        ["\\dartagnan", "PTX6.0", dat3m_ptx60_safety_size, dat3m_ptx60_liveness_size, 0, dat3m_ptx60_total_size,
-         f"{dat3m_ptx60_total_time:.0f}", f"{dat3m_ptx60_total_average:.0f}"],
-        ["\\alloy", "PTX6.0", 0, 0, 0, 0, 0, 0],
-        ["\\dartagnan", "PTX7.5", dat3m_ptx75_safety_size, dat3m_ptx75_liveness_size, 0, dat3m_ptx75_total_size,
-         f"{dat3m_ptx75_total_time:.0f}", f"{dat3m_ptx75_total_average:.0f}"],
-        ["\\alloy", "PTX7.5", alloy_ptx75_safety_size, 0, 0, alloy_ptx75_total_size,
-         f"{alloy_ptx75_total_time:.0f}", f"{alloy_ptx75_total_average:.0f}"],
-        ["\\dartagnan", "Vulkan", dat3m_vkn_safety_size, dat3m_vkn_liveness_size, dat3m_vkn_dr_size,
-         dat3m_vkn_total_size, f"{dat3m_vkn_total_time:.0f}", f"{dat3m_vkn_total_average:.0f}"],
-        ["\\alloy", "Vulkan", alloy_vkn_safety_size, 0, alloy_vkn_dr_size, alloy_vkn_total_size,
-         f"{alloy_vkn_total_time:.0f}", f"{alloy_vkn_total_average:.0f}"],
+        ["Tool", "Model", "Safety", "Liveness", "DRF", "Total", "Time", "Time/Completed", "Solver", "CPU",
+         "Peak RSS (MB)"],
+        dartagnan_row("PTX6.0"),
+        ["\\alloy", "PTX6.0", 0, 0, 0, 0, 0, 0, 0, 0, 0],
+        dartagnan_row("PTX7.5"),
+        ["\\alloy", "PTX7.5", alloy_ptx["launches"], 0, 0, alloy_ptx["launches"]] +
+        timing(alloy_ptx, alloy_ptx["completed_launches"]) + usage(alloy_ptx),
+        dartagnan_row("Vulkan"),
+        ["\\alloy", "Vulkan", alloy_vkn_safety, 0, alloy_vkn_dr, alloy_vkn_safety + alloy_vkn_dr] +
+        timing(alloy_vkn, alloy_vkn_completed) + usage(alloy_vkn),
     ]
 
     Utils.print_table("table5.csv", table)
@@ -1,30 +1,139 @@
+import argparse
+import math
 import os
+import re
+import subprocess
+import tempfile
 
 import env
-from utils import Utils
+from utils import ResultCache, ResultStore, Utils
+
+OPENCL_DIR = os.path.join(env.GPU_VERIFY_HOME, "latest_benchmarks/OpenCL/")
+COMPILED_DIR = os.path.join(env.BENCHMARKS_DIR, "gpuverify")
+COMPILED_FILTER = os.path.join(COMPILED_DIR, "clspv-compilation-filter.txt")
+CLSPV_OPTIONS = ["--cl-std=CL2.0", "--inline-entry-points", "--spv-version=1.6"]
+
+
+def get_compiled_filename(test):
+    return os.path.join(COMPILED_DIR, os.path.relpath(test, OPENCL_DIR)[:-len(".cl")] + ".spv.dis")
 
 
 def get_dat3m_tests():
+    # Kernels compiled by --compile-tests, otherwise the disassembled kernels shipped with Dat3M
+    if os.path.exists(COMPILED_FILTER):
+        return Utils.list_files(COMPILED_DIR, ".spv.dis")
     return Utils.list_files(os.path.join(env.DAT3M_HOME, "dartagnan/src/test/resources/spirv/gpuverify"), "spv.dis")
 
 
 def get_gpuverify_tests():
-    all = Utils.list_files(os.path.join(env.GPU_VERIFY_HOME, "latest_benchmarks/OpenCL/"), ".cl")
-    with open(os.path.join(env.FILTER_DIR, "clspv-compilation-filter.txt"), "r") as f:
-        filter = [os.path.join(env.GPU_VERIFY_HOME, test.strip()) for test in f.readlines()]
+    all = Utils.list_files(OPENCL_DIR, ".cl")
+    # The filter derived by --compile-tests, otherwise the one maintained by hand
+    path = COMPILED_FILTER if os.path.exists(COMPILED_FILTER) else os.path.join(env.FILTER_DIR,
+                                                                                "clspv-compilation-filter.txt")
+    with open(path, "r") as f:
+        filter = {os.path.join(env.GPU_VERIFY_HOME, test.strip()) for test in f if not test.startswith("#")}
     return [test for test in all if test not in filter]
 
 
+# Kernels of GPUVerify and, for dartagnan, their Spir-V disassembly, see Utils.tests
+GROUPS = {
+    "dartagnan": {"tool": "dartagnan", "tests": get_dat3m_tests, "args": ["spirv", "cat_spec", "vulkan"]},
+    "gpuverify": {"tool": "gpuverify", "tests": get_gpuverify_tests},
+}
+
+
+def size(value):
+    # A size of GPUVerify, either a number or a list of the sizes of every dimension, e.g. [64,64]
+    return math.prod([int(dimension, 0) for dimension in value.strip("[]").split(",")])
+
+
+def get_config(test):
+    # @Config: threads per workgroup as a single subgroup, one subgroup, number of workgroups
+    options = dict(re.findall(r'--(local_size|global_size|num_groups)=(\S+)', " ".join(Utils.gpuverify_options(test))))
+    if "local_size" not in options:
+        return None
+    try:
+        local = size(options["local_size"])
+        if "num_groups" in options:
+            groups = size(options["num_groups"])
+        else:
+            groups = size(options.get("global_size", "0")) // local
+    except (ValueError, ZeroDivisionError):
+        return None
+    return f"; @Config: {local}, 1, {max(groups, 1)}"
+
+
+def compile_kernel(test, header):
+    # clspv and spirv-dis of one kernel, False (and no output) if either fails
+    target = get_compiled_filename(test)
+    with tempfile.TemporaryDirectory() as tmp:
+        spv = os.path.join(tmp, "kernel.spv")
+        compiled = subprocess.run(["clspv", test, *CLSPV_OPTIONS, "-o", spv],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+        disassembled = subprocess.run(["spirv-dis", spv], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                      text=True) if compiled else None
+    if disassembled is None or disassembled.returncode != 0:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+    with Utils.replace_file(target) as f:
+        if header is not None:
+            f.write(header + "\n")
+        f.write(disassembled.stdout)
+    return True
+
+
+def version(tool):
+    return subprocess.run([tool, "--version"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True).stdout
+
+
+def compile_tests():
+    # A kernel is compiled again only if its source, its configuration or a compiler changed
+    compilers = f"{version('clspv')}\n{version('spirv-dis')}\n{CLSPV_OPTIONS}"
+    tasks = []
+    for test in Utils.list_files(OPENCL_DIR, ".cl"):
+        header = get_config(test)
+        tasks.append((get_compiled_filename(test), f"{compilers}\n{ResultCache.digest(test)}\n{header}",
+                      compile_kernel, (test, header)))
+    failed = Utils.generate(tasks)
+    # The failures of all kernels, also of those not compiled again, in the format of filter/
+    failures = sorted([os.path.relpath(test, env.GPU_VERIFY_HOME) for path, _, _, (test, _) in tasks if path in failed])
+    Utils.write_lines(COMPILED_FILTER, ["# Compilation to Spir-V failed"] + failures + [""])
+    print(f"Compilation filter with {len(failures)} kernels written to {COMPILED_FILTER}")
+
+
+def timing(summary):
+    # Median and confidence interval of the total when the tests were measured repeatedly, see --repeat. The time
+    # only sums completed runs and is shared by the completed tests.
+    stats = summary["stats"]
+    size = max(summary["completed"], 1)
+    return [Utils.format_time(summary["time"], stats),
+            Utils.format_time(summary["time"] / size, stats.scale(1 / size) if stats is not None else None)]
+
+
+def row(name, summary):
+    return [name, summary["tests"]] + timing(summary) + [f"{summary['cpu']:.0f}", f"{summary['peak_rss']:.0f}"]
+
+
 def main():
-    table = [["Tool", "Tests", "Time", "Time/Tests"]]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--compile-tests", dest="compile", action="store_true",
+                        help="compile the OpenCL kernels of GPUVerify for dartagnan and derive the compilation filter")
+    Utils.add_arguments(parser)
+    args = parser.parse_args()
+    Utils.configure(args, tools=not args.compile)
+    if args.compile:
+        compile_tests()
+        return
+
+    table = [["Tool", "Tests", "Time", "Time/Completed", "CPU", "Peak RSS (MB)"]]
 
-    tests = get_dat3m_tests()
-    time = sum([Utils.run_dartagnan_test(test, "spirv", "cat_spec", "vulkan").time for test in tests])
-    table.append(["\\dartagnan", len(tests), f"{time:.0f}", f"{(time / len(tests)):.0f}"])
+    Utils.run_jobs(Utils.jobs(GROUPS))
 
-    tests = get_gpuverify_tests()
-    time = sum([Utils.run_gpuverify_test(test).time for test in tests])
-    table.append(["\\gpuverify", len(tests), f"{time:.0f}", f"{(time / len(tests)):.0f}"])
+    tools = Utils.store.summary(["tool"])
+    Utils.print_times("Dartagnan", tools.get("dartagnan", ResultStore.empty))
+    table.append(row("\\dartagnan", tools.get("dartagnan", ResultStore.empty)))
+    table.append(row("\\gpuverify", tools.get("gpuverify", ResultStore.empty)))
 
     Utils.print_table("table6.csv", table)
 
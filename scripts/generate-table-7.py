@@ -1,9 +1,12 @@
 import argparse
+import functools
+import inspect
 import os
+import re
 import shutil
 
 import env
-from utils import Utils
+from utils import ResultCache, ResultStore, Utils
 
 
 data = [
@@ -38,8 +41,13 @@ def get_template_filename(entry):
 
 
 def get_benchmark_filename(entry):
+    threads = entry["grid"][0] * entry["grid"][1]
+    if entry.get("sweep"):
+        # Grids of a sweep may have the same number of threads, the thread count stays last for the cost model
+        return os.path.join(env.BENCHMARKS_DIR, "spirv-sweep",
+            f"{entry['name']}-{entry['grid'][0]}x{entry['grid'][1]}-{threads}.spv.dis")
     return os.path.join(env.BENCHMARKS_DIR, "spirv",
-        entry["name"] + "-" + str(entry["grid"][0] * entry["grid"][1]) + ".spv.dis")
+        entry["name"] + "-" + str(threads) + ".spv.dis")
 
 
 def format_result(result):
@@ -47,40 +55,260 @@ def format_result(result):
         return "\\cmark"
     if result == "FAIL":
         return "\\xmark"
+    if result == "UNKNOWN":
+        # The bound is too small to unroll the loops of the program
+        return "?"
+    if result == "OOM":
+        return "OOM"
+    if result == "TIMEOUT":
+        return "TO"
     raise ValueError(f"Invalid verification result: {result}")
 
 
-def generate_benchmarks():
-    os.makedirs(os.path.join(env.BENCHMARKS_DIR, "spirv"), exist_ok=True)
-    for entry in data:
-        with open(get_template_filename(entry), "r") as f_src:
-            with open(get_benchmark_filename(entry), "w") as f_dst:
-                f_dst.write(f"; @Config: {entry['grid'][0]}, 1, {entry['grid'][1]}\n")
-                f_dst.write(f_src.read())
+class Template:
+    # A template is parsed once per process. The @Input buffers of a template are sized for its largest grid; every
+    # buffer is resized to the extent of the grid its indices derive from (all threads, the threads of a workgroup or
+    # the workgroups), found by following the operands of its access chains back to the builtin variables. The SPIR-V
+    # body after the header is copied into every benchmark unchanged.
+    extents = {
+        "GlobalInvocationId": lambda x, y, z: x * y * z,
+        "LocalInvocationId": lambda x, y, z: x * y,
+        "LocalInvocationIndex": lambda x, y, z: x * y,
+        "SubgroupLocalInvocationId": lambda x, y, z: x,
+        "SubgroupId": lambda x, y, z: y,
+        "WorkgroupId": lambda x, y, z: z,
+    }
+    re_input = re.compile(r'; @Input: (%\w+) = \{\{([^{}]*)\}\}$')
+    re_reference = re.compile(r'(%\w+)\[0\]\[(\d+)\]')
+    re_instruction = re.compile(r'(?:(%\w+) = )?(Op\w+)(.*)$')
+    re_builtin = re.compile(r'OpDecorate (%\w+) BuiltIn (\w+)')
+
+    def __init__(self, path):
+        self.path = path
+        self.header = []
+        # A template without header lines is copied from its first byte
+        self.offset = 0
+        with open(path, "rb") as f:
+            for line in iter(f.readline, b""):
+                if not line.startswith(b"; @"):
+                    break
+                self.header.append(line.decode("utf-8").rstrip("\n"))
+                self.offset = f.tell()
+            else:
+                self.offset = f.tell()
+            f.seek(self.offset)
+            self.builtins = self.index_builtins(f.read().decode("utf-8"))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def load(path, mtime):
+        return Template(path)
+
+    def index_builtins(self, body):
+        # For every buffer, the builtins its access chains are indexed with
+        names = {match[1] for match in map(self.re_input.match, self.header) if match is not None}
+        definitions = {}
+        accesses = {name: [] for name in names}
+        builtins = {}
+        for line in body.splitlines():
+            match = self.re_builtin.search(line)
+            if match is not None:
+                builtins[match[1]] = match[2]
+                continue
+            match = self.re_instruction.search(line)
+            if match is None or match[1] is None:
+                continue
+            operands = match[3].split()
+            definitions[match[1]] = operands
+            if match[2] in ["OpAccessChain", "OpInBoundsAccessChain"] and len(operands) > 2 and operands[1] in names:
+                accesses[operands[1]].append(operands[-1])
+        return {name: self.trace(indices, definitions, builtins) for name, indices in accesses.items()}
+
+    @staticmethod
+    def trace(indices, definitions, builtins):
+        found = set()
+        visited = set()
+        pending = list(indices)
+        while pending:
+            value = pending.pop()
+            if value in visited:
+                continue
+            visited.add(value)
+            if value in builtins:
+                found.add(builtins[value])
+            pending += [operand for operand in definitions.get(value, []) if operand.startswith("%")]
+        return {builtin for builtin in found if builtin in Template.extents}
+
+    def size(self, name, grid):
+        if not self.builtins.get(name):
+            return None
+        return max([Template.extents[builtin](grid[0], 1, grid[1]) for builtin in self.builtins[name]])
+
+    def render_header(self, grid):
+        lines = [f"; @Config: {grid[0]}, 1, {grid[1]}"]
+        sizes = {}
+        for line in self.header:
+            match = self.re_input.match(line)
+            if match is not None:
+                values = [value.strip() for value in match[2].split(",")]
+                size = self.size(match[1], grid)
+                # Only buffers with a single initial value can be resized, the others are kept as they are
+                if size is not None and len(set(values)) == 1:
+                    sizes[match[1]] = size
+                    line = f"; @Input: {match[1]} = {{{{{', '.join([values[0]] * size)}}}}}"
+                lines.append(line)
+            elif line.startswith("; @Output"):
+                # Assertions on elements of threads that are not in the grid are dropped
+                references = self.re_reference.findall(line)
+                if all([int(index) < sizes.get(name, int(index) + 1) for name, index in references]):
+                    lines.append(line)
+            elif not line.startswith("; @Config"):
+                lines.append(line)
+        return "".join([line + "\n" for line in lines])
+
+    def copy_body(self, f_dst):
+        # Zero-copy from the template to the benchmark, plain copy where sendfile does not support the files
+        f_dst.flush()
+        with open(self.path, "rb") as f_src:
+            offset = self.offset
+            remaining = os.fstat(f_src.fileno()).st_size - offset
+            try:
+                while remaining > 0:
+                    sent = os.sendfile(f_dst.fileno(), f_src.fileno(), offset, remaining)
+                    if sent == 0:
+                        break
+                    offset += sent
+                    remaining -= sent
+            except OSError:
+                f_src.seek(offset)
+                shutil.copyfileobj(f_src, f_dst.buffer)
+
+
+def write_benchmark(entry):
+    path = get_template_filename(entry)
+    template = Template.load(path, os.stat(path).st_mtime_ns)
+    with Utils.replace_file(get_benchmark_filename(entry)) as f_dst:
+        f_dst.write(template.render_header(entry["grid"]))
+        template.copy_body(f_dst)
+
+
+def generate_benchmarks(entries):
+    # A benchmark is written again if its template, its grid or this generator changed
+    source = inspect.getsource(Template) + inspect.getsource(write_benchmark)
+    Utils.generate([(get_benchmark_filename(entry),
+                     f"{source}\n{ResultCache.digest(get_template_filename(entry))}\n{entry['grid']}",
+                     write_benchmark, (entry,)) for entry in entries])
 
 
 def run_benchmarks():
-    table = [["Program", "Grid", "Threads", "Events", "Result", "Time"]]
-    for entry in data:
-        path = get_benchmark_filename(entry)
-        result = Utils.run_dartagnan_test(path, "spirv", "cat_spec", "vulkan", bound=entry["bound"])
+    table = [["Program", "Grid", "Threads", "Events", "Result", "Time", "CPU", "Peak RSS (MB)", "GC"]]
+    jobs = [Utils.job("dartagnan", get_benchmark_filename(entry), "spirv", "cat_spec", "vulkan",
+                      bound=entry["bound"]) for entry in data]
+    results = Utils.run_jobs({"spirv": jobs})["spirv"]
+    for entry, result in zip(data, results):
         table.append([
                     entry['name'],
                     f"{entry['grid'][0]}.{entry['grid'][1]}",
                     f"{entry['grid'][0] * entry['grid'][1]}",
-                    result.events,
+                    result.events if result.events is not None else "-",
                     format_result(result.result),
-                    f"{result.time:.0f}"
+                    Utils.format_time(result.time, result.stats),
+                    f"{result.cpu_time:.0f}" if result.cpu_time is not None else "-",
+                    f"{result.peak_rss:.0f}" if result.peak_rss is not None else "-",
+                    f"{result.gc_time:.0f}" if result.gc_time is not None else "-"
                 ])
+    Utils.print_times("Dartagnan", Utils.store.summary(["tool"]).get("dartagnan", ResultStore.empty))
     Utils.print_table("table7.csv", table)
 
 
+def format_cell(result):
+    if result is None:
+        return "pruned"
+    if result.time is None:
+        return format_result(result.result)
+    events = f" ({result.events})" if result.events is not None else ""
+    return f"{format_result(result.result)} {Utils.format_time(result.time, result.stats)}{events}"
+
+
+def frontier(results):
+    # Configurations that completed and are not contained in a larger one that completed
+    completed = [point for point, result in results.items() if result is not None and result.time is not None]
+    return [point for point in completed
+            if not any([other != point and all([o >= p for o, p in zip(other, point)]) for other in completed])]
+
+
+def sweep_benchmarks(names, subgroups, workgroups, bounds):
+    # Every configuration (subgroup size, workgroups, bound) at least as large as one that ran out of memory or time
+    # is pruned; an UNKNOWN verdict (a bound too small) completed and prunes nothing. Configurations are run in rounds by the sum of their positions in the ranges: no configuration of a
+    # round contains another one, so a round runs concurrently and only prunes the later rounds.
+    points = [(x, z, bound) for x in subgroups for z in workgroups for bound in bounds]
+    results = {name: {} for name in names}
+    failed = {name: [] for name in names}
+    wall = 0
+    for level in range(len(subgroups) + len(workgroups) + len(bounds) - 2):
+        groups = {}
+        for name in names:
+            for x, z, bound in points:
+                if subgroups.index(x) + workgroups.index(z) + bounds.index(bound) != level:
+                    continue
+                if any([x >= fx and z >= fz and bound >= fb for fx, fz, fb in failed[name]]):
+                    results[name][(x, z, bound)] = None
+                    continue
+                entry = {"name": name, "grid": [x, z], "bound": bound, "sweep": True}
+                groups[(name, x, z, bound)] = entry
+        if not groups:
+            continue
+        generate_benchmarks(list(groups.values()))
+        jobs = {key: [Utils.job("dartagnan", get_benchmark_filename(entry), "spirv", "cat_spec", "vulkan",
+                                bound=entry["bound"])] for key, entry in groups.items()}
+        for (name, x, z, bound), [result] in Utils.executor.run(jobs).items():
+            results[name][(x, z, bound)] = result
+            if result.time is None:
+                failed[name].append((x, z, bound))
+        wall += Utils.executor.wall
+    runs = sum([result is not None for name in names for result in results[name].values()])
+    print(f"Sweep: {runs} of {len(points) * len(names)} configurations run, the others pruned, "
+          f"wall-clock time {wall:.0f} ms")
+
+    table = [["Program", "Subgroup size", "Workgroups", "Threads", "Bound", "Events", "Result", "Time", "Frontier"]]
+    for name in names:
+        edge = frontier(results[name])
+        print(f"Frontier of {name}: " + ", ".join([f"{x}.{z} bound {bound}" for x, z, bound in edge]))
+        for (x, z, bound), result in sorted(results[name].items()):
+            table.append([name, x, z, x * z, bound,
+                          result.events if result is not None and result.events is not None else "-",
+                          format_result(result.result) if result is not None else "pruned",
+                          Utils.format_time(result.time, result.stats) if result is not None else "-",
+                          "*" if (x, z, bound) in edge else ""])
+        # Heat map: verdict, time and events of every grid, one block of rows per bound
+        heat_map = [["Bound", "Subgroup size"] + [f"{z} workgroups" for z in workgroups]]
+        for bound in bounds:
+            for x in subgroups:
+                heat_map.append([bound, x] + [format_cell(results[name][(x, z, bound)]) for z in workgroups])
+        Utils.print_table(f"table7-sweep-{name}.csv", heat_map)
+    Utils.print_table("table7-sweep.csv", table)
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--generate-tests", dest="generate", action="store_true")
+    parser.add_argument("--sweep", dest="sweep", action="store_true",
+                        help="run every combination of the ranges below instead of the configurations of the paper")
+    parser.add_argument("--template", dest="templates", action="append",
+                        help="template of the sweep (repeatable, default caslock, ticketlock, ttaslock and xf-barrier)")
+    parser.add_argument("--subgroups", dest="subgroups", default="1-4",
+                        help="sweep: threads per subgroup, e.g. 1-4 or 2,4,8")
+    parser.add_argument("--workgroups", dest="workgroups", default="1-4", help="sweep: number of workgroups")
+    parser.add_argument("--bounds", dest="bounds", default="1-4", help="sweep: loop bounds")
+    Utils.add_arguments(parser)
     args = parser.parse_args()
+    Utils.configure(args, tools=not args.generate)
     if args.generate:
-        generate_benchmarks()
+        generate_benchmarks(data)
+    elif args.sweep:
+        sweep_benchmarks(args.templates or ["caslock", "ticketlock", "ttaslock", "xf-barrier"],
+                         Utils.parse_numbers(args.subgroups), Utils.parse_numbers(args.workgroups),
+                         Utils.parse_numbers(args.bounds))
     else:
         run_benchmarks()
 
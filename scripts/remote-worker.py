@@ -0,0 +1,91 @@
+import argparse
+import json
+import socket
+import threading
+import time
+import traceback
+
+from utils import Coordinator, Utils
+
+# Runs the tests of a coordinator, e.g. `generate-table-5.py --coordinator 7000 --jobs 16`, on this node.
+# Every node needs the same image as the coordinator: the tests are sent as paths and run with the tools installed
+# here. The tool options (timeouts, worker pools, --repeat, ...) are those given to this script.
+# Usage: python3 remote-worker.py <coordinator host>:<port> --jobs 4
+
+
+def execute(message):
+    # Only the registered tools are run, see Tool
+    job = Utils.job(message["tool"], *message["args"], **message["kwargs"])
+    try:
+        result = Utils.executor.execute(job)
+    except Exception:
+        return {"error": traceback.format_exc()}
+    return {"config": Utils.job_config(job), "result": result.record(), "cached": result.cached}
+
+
+def serve(connection):
+    lock = threading.Lock()
+
+    def send(message):
+        with lock:
+            Coordinator.send(connection, message)
+
+    def beat(done):
+        while not done.wait(Coordinator.heartbeat):
+            try:
+                send({"heartbeat": True})
+            except OSError:
+                return
+
+    with connection, connection.makefile("r", encoding="utf-8") as reader:
+        for line in reader:
+            done = threading.Event()
+            threading.Thread(target=beat, args=(done,), daemon=True).start()
+            try:
+                reply = execute(json.loads(line))
+            finally:
+                done.set()
+            send(reply)
+
+
+def connect(address, once, finished):
+    # A worker outlives the coordinator of one script and waits for the next, unless --once
+    host, _, port = address.rpartition(":")
+    while not finished.is_set():
+        try:
+            connection = Coordinator.keepalive(socket.create_connection((host or "localhost", int(port))))
+        except OSError:
+            time.sleep(1)
+            continue
+        try:
+            serve(connection)
+        except OSError:
+            pass
+        if once:
+            finished.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the tests of a coordinator")
+    parser.add_argument("address", metavar="[HOST:]PORT", help="address of the coordinator")
+    parser.add_argument("--once", dest="once", action="store_true",
+                        help="exit when the coordinator closes the connection instead of waiting for the next one")
+    Utils.add_arguments(parser)
+    args = parser.parse_args()
+    Utils.configure(args)
+    # Results go back to the journal of the coordinator
+    Utils.journal = None
+    Utils.store = None
+    Utils.cost_model = None
+    # With --once the first connection closed by the coordinator ends the others, also those still connecting
+    finished = threading.Event()
+    connections = [threading.Thread(target=connect, args=(args.address, args.once, finished))
+                   for _ in range(Utils.executor.jobs)]
+    for connection in connections:
+        connection.start()
+    for connection in connections:
+        connection.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import sys
+import time
+
+# Stand-in for worker/Worker.java that answers every job with canned dartagnan output,
+# or with canned RunCommandLine output if that is the main class given as argument.
+# Usage: --dartagnan-workers 4 --dartagnan-worker-command "python3 /home/scripts/stub-worker.py"
+#        --alloy-vkn-worker-command "python3 /home/scripts/stub-worker.py RunCommandLine"
+
+OUTPUT = """{test}
+#Annotations: 0
+#Stores: 2
+#Loads: 2
+#Inits: 2
+#Others: 4
+Verification finished with result PASS
+Total verification time: {seconds:.3f} secs
+"""
+
+ALLOY_OUTPUT = """Running {test}
+"""
+
+
+def main():
+    for line in sys.stdin:
+        args = line.rstrip("\n").split("\t")
+        if not args[0]:
+            continue
+        start = time.time()
+        if sys.argv[1:] == ["RunCommandLine"]:
+            out = ALLOY_OUTPUT.format(test=args[0]).encode("utf-8")
+        else:
+            out = OUTPUT.format(test=args[0], seconds=time.time() - start).encode("utf-8")
+        millis = int((time.time() - start) * 1000)
+        sys.stdout.buffer.write(f"@@WORKER 0 {millis} {len(out)} 0\n".encode("utf-8"))
+        sys.stdout.buffer.write(out)
+        sys.stdout.buffer.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,204 +1,2165 @@
 from abc import ABC
+import atexit
+import contextlib
+import hashlib
+import json
+import math
 import os
+import queue
+import random
 import re
 import csv
+import shlex
+import shutil
+import signal
 import subprocess
-from tabulate import tabulate
+import sys
+import tempfile
+import threading
+from collections import deque
 import time
 
 import env
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
-class Result(ABC):
-    def __init__(self, time, out, err):
-        self.time = None
+
+class Execution:
+    def __init__(self, out, err, exit_code, timed_out, wall, cpu_user=None, cpu_system=None, peak_rss=None,
+                 gc_time=None, parser=None, solver_time=None, phases=None):
         self.out = out
         self.err = err
-        if "java.lang.OutOfMemoryError: Java heap space" not in err:
+        self.exit_code = exit_code
+        self.timed_out = timed_out
+        self.wall = wall
+        self.cpu_user = cpu_user
+        self.cpu_system = cpu_system
+        self.peak_rss = peak_rss
+        self.gc_time = gc_time
+        self.parser = parser
+        self.solver_time = solver_time
+        # Milliseconds per phase of the run, see Profiler
+        self.phases = phases
+
+
+class MemorySampler(threading.Thread):
+    # rusage only reports the largest single process, the sampler sums the RSS of the whole tree
+    def __init__(self, pid, interval=0.1):
+        super().__init__(daemon=True)
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                processes = [self.process] + self.process.children(recursive=True)
+                self.peak = max(self.peak, sum([p.memory_info().rss for p in processes]))
+            except psutil.Error:
+                pass
+
+    def stop(self):
+        self.stopped.set()
+        return self.peak
+
+
+class Stats:
+    # Median, interquartile range and bootstrap confidence interval of the median of repeated measurements
+    threshold = 0.1
+    resamples = 1000
+    confidence = 0.95
+
+    def __init__(self, samples):
+        self.samples = sorted(samples)
+        self.median = Stats.quantile(self.samples, 0.5)
+        self.iqr = Stats.quantile(self.samples, 0.75) - Stats.quantile(self.samples, 0.25)
+        medians = self.samples
+        if len(self.samples) > 1:
+            # Fixed seed, the same measurements always give the same interval
+            rng = random.Random(0)
+            medians = sorted([Stats.quantile(sorted(rng.choices(self.samples, k=len(self.samples))), 0.5)
+                              for _ in range(Stats.resamples)])
+        self.low = Stats.quantile(medians, (1 - Stats.confidence) / 2)
+        self.high = Stats.quantile(medians, (1 + Stats.confidence) / 2)
+
+    @staticmethod
+    def quantile(samples, q):
+        position = q * (len(samples) - 1)
+        i = int(position)
+        if i + 1 >= len(samples):
+            return samples[-1]
+        return samples[i] + (samples[i + 1] - samples[i]) * (position - i)
+
+    @property
+    def unstable(self):
+        return self.median > 0 and self.iqr / self.median > Stats.threshold
+
+    def scale(self, factor):
+        return Stats([sample * factor for sample in self.samples])
+
+    def __str__(self):
+        return f"{self.median:.0f} [{self.low:.0f}, {self.high:.0f}]" + ("*" if self.unstable else "")
+
+
+class Result(ABC):
+    types = {}
+    usage = ["wall", "cpu_user", "cpu_system", "peak_rss", "gc_time"]
+    fields = ["time", "times", "status", "exit_code", "heap", "cached"] + usage
+    tail_lines = 1000
+
+    class Parser:
+        # Consumes the output in chunks of whole lines (a single line while the tool runs, or the complete
+        # output at once) in a single pass; done is set once the verdict is known
+        re_out = None
+
+        def __init__(self):
+            self.oom = False
+            self.done = False
+
+        def feed(self, text, stream):
+            if stream == "err":
+                self.feed_err(text)
+            else:
+                self.feed_out(text)
+
+        def feed_out(self, text):
+            if self.re_out is not None:
+                for match in self.re_out.finditer(text):
+                    self.on_match(match)
+
+        def on_match(self, match):
+            pass
+
+        def feed_err(self, text):
+            if "java.lang.OutOfMemoryError: Java heap space" in text:
+                self.oom = True
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Result.types[cls.__name__] = cls
+
+    def __init__(self, time, out, err, exit_code=0, timeout=False, parser=None):
+        if parser is None:
+            parser = self.Parser()
+            parser.feed(out, "out")
+            parser.feed(err, "err")
+        self.parser = parser
+        self.time = None
+        self.times = None
+        self.out = Result.tail(out)
+        self.err = Result.tail(err)
+        self.exit_code = exit_code
+        self.cached = False
+        # -Xmx in MB of a run of a java tool, see Tool.execute
+        self.heap = None
+        if timeout:
+            self.status = "TIMEOUT"
+        elif parser.oom:
+            self.status = "OOM"
+        else:
+            self.status = "OK"
             self.time = int(time)
+        if self.time is None:
+            self.result = self.status
+
+    @staticmethod
+    def tail(text):
+        if text.count("\n") <= Result.tail_lines:
+            return text
+        return "".join(text.splitlines(keepends=True)[-Result.tail_lines:])
+
+    def record(self):
+        record = {"type": type(self).__name__}
+        for field in self.fields:
+            record[field] = getattr(self, field, None)
+        return record
+
+    @staticmethod
+    def from_record(record):
+        result_class = Result.types[record["type"]]
+        result = result_class.__new__(result_class)
+        result.out = ""
+        result.err = ""
+        for field in result.fields:
+            setattr(result, field, record.get(field))
+        # Journals of earlier versions do not say whether a result was cached
+        result.cached = bool(result.cached)
+        return result
+
+    @classmethod
+    def of(cls, execution):
+        start = time.perf_counter()
+        result = cls(execution.wall, execution.out, execution.err, execution.exit_code, execution.timed_out,
+                     execution.parser)
+        for field in Result.usage:
+            setattr(result, field, getattr(execution, field))
+        result.phases = execution.phases
+        if result.phases is not None:
+            result.phases["parse"] = result.phases.get("parse", 0) + (time.perf_counter() - start) * 1000
+        return result
+
+    @property
+    def stats(self):
+        # Only for tests measured more than once, see --repeat
+        if self.times is None or len(self.times) < 2:
+            return None
+        return Stats(self.times)
+
+    @property
+    def cpu_time(self):
+        if self.cpu_user is None or self.cpu_system is None:
+            return None
+        return self.cpu_user + self.cpu_system
 
 
 class Dat3MResult(Result):
-    re_result_str = re.compile(r'Verification finished with result (FAIL|PASS|UNKNOWN)')
-    re_result_val = re.compile(r'(FAIL|PASS|UNKNOWN)')
-    re_time_str = re.compile(r'Total verification time: (\d+.\d* secs|\d+:\d+ mins|\d+:\d+:\d+ hours)')
-    re_time_val_sec = re.compile(r'\d+.\d*')
-    re_time_val_min = re.compile(r'\d+:\d+')
-    re_time_val_hour = re.compile(r'\d+:\d+:\d+')
-    re_events_str = [
-        re.compile(r'#Annotations: \d+'),
-        re.compile(r'#Stores: \d+'),
-        re.compile(r'#Loads: \d+'),
-        re.compile(r'#Inits: \d+'),
-        re.compile(r'#Others: \d+')
-    ]
-    re_events_val = re.compile(r'\d+'),
-
-    def __init__(self, time, out, err):
-        super().__init__(time, out, err)
+    fields = Result.fields + ["result", "parsed_time", "events"]
+    event_types = ["Annotations", "Stores", "Loads", "Inits", "Others"]
+
+    class Parser(Result.Parser):
+        # A scan per value, only of text containing its literal and skipped once the value is known: scanning for
+        # the alternation of all of them is about twice as slow on large logs (see benchmark-parsers.py)
+        re_result = re.compile(r'Verification finished with result (FAIL|PASS|UNKNOWN)')
+        re_time = re.compile(r'Total verification time: (?:(?P<secs>\d+.\d*) secs'
+                             r'|(?P<mins>\d+:\d+) mins|(?P<hours>\d+:\d+:\d+) hours)')
+        re_event = re.compile(r'#(Annotations|Stores|Loads|Inits|Others): (\d+)')
+
+        def __init__(self):
+            super().__init__()
+            self.result = None
+            self.time = None
+            self.events = {}
+
+        def feed_out(self, text):
+            if self.result is None and "Verification finished" in text:
+                match = self.re_result.search(text)
+                if match is not None:
+                    self.result = match[1]
+            if self.time is None and "Total verification time" in text:
+                match = self.re_time.search(text)
+                if match is not None:
+                    if match.lastgroup == "secs":
+                        self.time = float(match["secs"]) * 1000
+                    else:
+                        parts = [int(part) for part in match[match.lastgroup].split(":")]
+                        self.time = sum(part * 60 ** i for i, part in enumerate(reversed(parts))) * 1000
+            if len(self.events) < len(Dat3MResult.event_types) and "#" in text:
+                for match in self.re_event.finditer(text):
+                    self.events.setdefault(match[1], int(match[2]))
+            self.done = (self.result is not None and self.time is not None and
+                         len(self.events) == len(Dat3MResult.event_types))
+
+    def __init__(self, time, out, err, exit_code=0, timeout=False, parser=None):
+        super().__init__(time, out, err, exit_code, timeout, parser)
+        self.parsed_time = None
+        self.events = None
         if self.time is not None:
             self.result = self.parse_result()
             self.parsed_time = self.parse_time()
             self.events = self.parse_events()
 
     def parse_result(self):
-        match1 = re.search(self.re_result_str, self.out)
-        if match1 is not None:
-            match2 = re.search(self.re_result_val, match1[0])
-            if match2 is not None:
-                return match2[0]
-        raise ValueError("Cannot find verification result")
+        if self.parser.result is None:
+            raise ValueError("Cannot find verification result")
+        return self.parser.result
 
     def parse_time(self):
-        match = re.search(self.re_time_str, self.out)
-        if match is not None:
-            if "secs" in match[0]:
-                return self.parse_seconds(match[0])
-            if "mins" in match[0]:
-                return self.parse_minutes(match[0])
-            if "hours" in match[0]:
-                return self.parse_hours(match[0])
-        raise ValueError("Cannot find verification time")
-
-    def parse_seconds(self, raw):
-        match = re.search(self.re_time_val_sec, raw)
-        if match is not None:
-            return float(match[0]) * 1000
-        raise ValueError("Malformed verification time seconds")
-
-    def parse_minutes(self, raw):
-        match = re.search(self.re_time_val_min, raw)
-        if match is not None:
-            parts = match[0].split(":")
-            return (int(parts[0]) * 60 + int(parts[1])) * 1000
-        raise ValueError("Malformed verification time minutes")
-
-    def parse_hours(self, raw):
-        match = re.search(self.re_time_val_hour, raw)
-        if match is not None:
-            parts = match[0].split(":")
-            return (int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])) * 1000
-        raise ValueError("Malformed verification time hours")
+        if self.parser.time is None:
+            raise ValueError("Cannot find verification time")
+        return self.parser.time
 
     def parse_events(self):
         events = 0
-        for regex in self.re_events_str:
-            events += self.parse_event_type(regex)
+        for event_type in self.event_types:
+            if event_type not in self.parser.events:
+                raise ValueError("Cannot find event count")
+            events += self.parser.events[event_type]
         return events
 
-    def parse_event_type(self, regex):
-        match1 = re.search(regex, self.out)
-        if match1 is not None:
-            match2 = re.search(r'\d+', match1[0])
-            if match2 is not None:
-                return int(match2[0])
-        raise ValueError("Cannot find event count")
-
 
 class AlloyPtxResult(Result):
-    re_result_fail = re.compile(r'breaks expectation')
-    re_result_pass = re.compile(r'(matches expectation|outcome permitted)')
+    fields = Result.fields + ["result", "launches", "translate_time", "solver_time"]
+
+    class Parser(Result.Parser):
+        # A test may launch several Alloy checks, so the verdict is only known when the tool exits
+        # No groups, an alternation of plain literals is considerably faster to scan for
+        re_out = re.compile(r'Launching Alloy\.\.\.|breaks expectation|matches expectation|outcome permitted')
+
+        def __init__(self):
+            super().__init__()
+            self.launches = 0
+            self.failed = False
+            self.passed = False
 
-    def __init__(self, time, out, err):
-        super().__init__(time, out, err)
+        def on_match(self, match):
+            if match[0] == "Launching Alloy...":
+                self.launches += 1
+            elif match[0] == "breaks expectation":
+                self.failed = True
+            else:
+                self.passed = True
+
+    def __init__(self, time, out, err, exit_code=0, timeout=False, parser=None):
+        super().__init__(time, out, err, exit_code, timeout, parser)
+        self.launches = self.parser.launches
+        self.translate_time = None
+        self.solver_time = None
         if self.time is not None:
             self.result = self.parse_result()
 
+    @classmethod
+    def of(cls, execution):
+        # Only the pooled runner measures the Alloy backend apart from the translator
+        result = super().of(execution)
+        if result.time is not None and execution.solver_time is not None:
+            result.solver_time = execution.solver_time
+            result.translate_time = max(result.time - execution.solver_time, 0)
+        return result
+
     def parse_result(self):
-        if re.search(self.re_result_fail, self.out) is not None:
+        if self.parser.failed:
             return "FAIL"
-        if re.search(self.re_result_pass, self.out) is not None:
+        if self.parser.passed:
             return "PASS"
         raise ValueError("Cannot find verification result")
 
 
 class AlloyVknResult(Result):
-    re_result_fail = re.compile(r'Test \S+.test.gen failed')
+    fields = Result.fields + ["result"]
+
+    class Parser(Result.Parser):
+        re_out = re.compile(r'Test \S+.test.gen failed')
+
+        def __init__(self):
+            super().__init__()
+            self.failed = False
 
-    def __init__(self, time, out, err):
-        super().__init__(time, out, err)
+        def on_match(self, match):
+            self.failed = True
+
+    def __init__(self, time, out, err, exit_code=0, timeout=False, parser=None):
+        super().__init__(time, out, err, exit_code, timeout, parser)
         if self.time is not None:
             self.result = self.parse_result()
 
     def parse_result(self):
-        if re.search(self.re_result_fail, self.out) is not None:
+        if self.parser.failed:
             return "FAIL"
         return "PASS"
 
 
 class GPUVerifyResult(Result):
-    re_result_str = re.compile(r'GPUVerify kernel analyser finished with \d+ verified, \d+ error')
-    re_result_pass = re.compile(r' 0 error')
+    fields = Result.fields + ["result"]
+
+    class Parser(Result.Parser):
+        re_out = re.compile(r'GPUVerify kernel analyser finished with \d+ verified, (?P<errors>\d+) error')
+
+        def __init__(self):
+            super().__init__()
+            self.errors = None
+            self.stack_dump = False
+
+        def on_match(self, match):
+            if self.errors is None:
+                self.errors = int(match["errors"])
+                self.done = True
 
-    def __init__(self, time, out, err):
-        super().__init__(time, out, err)
+        def feed_err(self, text):
+            super().feed_err(text)
+            self.stack_dump = self.stack_dump or "Stack dump:" in text
+
+    def __init__(self, time, out, err, exit_code=0, timeout=False, parser=None):
+        super().__init__(time, out, err, exit_code, timeout, parser)
         if self.time is not None:
-            if "Stack dump:" in err:
+            if self.parser.stack_dump:
                 self.result = "FAIL"
             else:
                 self.result = self.parse_result()
             self.time = int(time)
 
     def parse_result(self):
-        match1 = re.search(self.re_result_str, self.out)
-        if match1 is not None:
-            match2 = re.search(self.re_result_pass, match1[0])
-            if match2 is not None:
-                return "PASS"
+        if self.parser.errors == 0:
+            return "PASS"
         return "FAIL"
 
 
+class ResultCache:
+    digests = {}
+
+    def __init__(self, path, mode="on", max_size=1 << 30, max_age=30):
+        self.path = path
+        self.mode = mode
+        self.max_size = max_size
+        self.max_age = max_age * 24 * 3600
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def digest(path):
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in ResultCache.digests:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            ResultCache.digests[key] = h.hexdigest()
+        return ResultCache.digests[key]
+
+    @staticmethod
+    def fingerprint(files):
+        return [ResultCache.digest(file) if os.path.isfile(file) else None for file in sorted(files)]
+
+    @staticmethod
+    def key(config, test, files):
+        parts = dict(config, test=ResultCache.digest(test), files=ResultCache.fingerprint(files),
+                     java=os.environ.get("_JAVA_OPTIONS"))
+        # Options that change the output or the times of a run; the time of a test also depends on how many run at once
+        parts.update(stop_at_verdict=Utils.stop_at_verdict, gc_time=Utils.gc_time, pin_cpus=Utils.pin_cpus,
+                     jobs=Utils.executor.jobs if Utils.executor is not None else 1)
+        if Utils.heap_model is not None:
+            # Out of memory then means out of the largest heap
+            parts["max_heap"] = Utils.heap_model.maximum
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.path, key[:2], key + ".json")
+
+    def lookup(self, key):
+        path = self.entry(key)
+        try:
+            with open(path, "r") as f:
+                result = Result.from_record(json.load(f))
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        result.cached = True
+        return result
+
+    def store(self, key, result):
+        path = self.entry(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + f".{threading.get_ident()}", "w") as f:
+            json.dump(result.record(), f)
+        os.replace(path + f".{threading.get_ident()}", path)
+
+    def run(self, key, run):
+        cached = self.lookup(key) if self.mode != "refresh" else None
+        if cached is None:
+            result = run()
+            # Timeouts depend on the limits of the run, not only on the test
+            if result.status != "TIMEOUT":
+                self.store(key, result)
+            return result
+        if self.mode != "timing":
+            return cached
+        # Fresh timing run, the verdict is still served from the cache
+        result = run()
+        if getattr(result, "result", None) != getattr(cached, "result", None):
+            print(f"Verdict changed from {getattr(cached, 'result', None)} to {getattr(result, 'result', None)}, "
+                  "serving the cached verdict")
+        if hasattr(cached, "result"):
+            result.result = cached.result
+        return result
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for dp, _, filenames in os.walk(self.path):
+            for f in filenames:
+                path = os.path.join(dp, f)
+                stat = os.stat(path)
+                if now - stat.st_mtime > self.max_age:
+                    os.remove(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        size = sum([entry[1] for entry in entries])
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            os.remove(path)
+            size -= entry_size
+
+
+class Journal:
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.resume = resume
+        self.records = {}
+        self.file = None
+        self.lock = threading.Lock()
+        if resume and os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # The last line may be incomplete if the previous run was killed
+                        continue
+                    self.records[Journal.key(record["config"])] = record["result"]
+
+    @staticmethod
+    def key(config):
+        return json.dumps(config, sort_keys=True)
+
+    def lookup(self, config):
+        record = self.records.get(Journal.key(config))
+        if record is None:
+            return None
+        result = Result.from_record(record)
+        result.cached = True
+        return result
+
+    def open(self):
+        # A new run keeps the journal of the previous one under the time it was last written
+        if not self.resume and os.path.exists(self.path):
+            root, ext = os.path.splitext(self.path)
+            suffix = time.strftime("%Y%m%d-%H%M%S", time.localtime(os.path.getmtime(self.path)))
+            os.replace(self.path, f"{root}-{suffix}{ext}")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, "a+")
+        if self.file.tell() > 0:
+            self.file.seek(self.file.tell() - 1)
+            if self.file.read(1) != "\n":
+                self.file.write("\n")
+
+    def append(self, config, result):
+        line = json.dumps({"config": config, "result": result.record()}) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.open()
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class ResultStore:
+    # Every result of every run, one row each, in a SQLite database that the tables and plots query. The results of
+    # the current run are the view this_run. Pattern, grid and thread count are taken from the names of generated
+    # benchmarks, e.g. SB-12.litmus or caslock-2x3-6.spv.dis.
+    columns = ["run", "script", "recorded", "suite", "tool", "test", "model", "property", "target", "bound",
+               "runner", "pattern", "grid", "threads", "verdict", "status", "time", "times", "parsed_time",
+               "solver_time", "events", "launches", "cpu", "peak_rss", "gc_time", "cached", "heap"]
+    re_benchmark = re.compile(r'(?P<pattern>.+?)-(?:(?P<grid>\d+x\d+)-)?(?P<threads>\d+)\.')
+    # Summary of a group without results
+    empty = {"tests": 0, "completed": 0, "time": 0, "parsed_time": 0, "solver": None, "cpu": 0, "peak_rss": 0,
+             "launches": 0, "completed_launches": 0, "stats": None}
+
+    def __init__(self, path, script):
+        import sqlite3
+        self.script = script
+        self.run = f"{script}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS results ({', '.join(self.columns)})")
+            # Stores written before a column was added get it empty
+            present = {row["name"] for row in self.connection.execute("PRAGMA table_info(results)")}
+            for column in self.columns:
+                if column not in present:
+                    self.connection.execute(f"ALTER TABLE results ADD COLUMN {column}")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_run ON results (run)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_test ON results (suite, tool, model, pattern)")
+            self.connection.execute(f"CREATE TEMP VIEW this_run AS SELECT * FROM results WHERE run = '{self.run}'")
+
+    def add(self, config, result):
+        test = config["test"]
+        match = self.re_benchmark.match(os.path.basename(test)) if test.startswith(env.BENCHMARKS_DIR) else None
+        row = {"run": self.run, "script": self.script, "recorded": time.time(), "suite": Utils.suite(config),
+               "tool": config["tool"], "test": test, "model": config.get("cat"), "property": config.get("property"),
+               "target": config.get("target"), "bound": config.get("bound"), "runner": config.get("runner"),
+               "pattern": match["pattern"] if match is not None else None,
+               "grid": match["grid"] if match is not None else None,
+               "threads": int(match["threads"]) if match is not None else None,
+               "verdict": getattr(result, "result", None), "status": result.status, "time": result.time,
+               "times": json.dumps(result.times) if result.times is not None else None,
+               "parsed_time": getattr(result, "parsed_time", None), "solver_time": getattr(result, "solver_time", None),
+               "events": getattr(result, "events", None), "launches": getattr(result, "launches", None),
+               "cpu": result.cpu_time, "peak_rss": result.peak_rss, "gc_time": getattr(result, "gc_time", None),
+               "cached": result.cached, "heap": getattr(result, "heap", None)}
+        with self.lock, self.connection:
+            self.connection.execute(f"INSERT INTO results ({', '.join(self.columns)}) "
+                                    f"VALUES ({', '.join(['?'] * len(self.columns))})",
+                                    [row[column] for column in self.columns])
+
+    def query(self, sql, *params):
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def summary(self, group, where="1", *params):
+        # Totals of the current run per group of columns. The solver time is the verification time of dartagnan or
+        # the Alloy backend time of pooled mixedproxy runs, None unless every completed test has one. With --repeat
+        # the stats of a group are those of the totals of the k-th measured runs of its completed tests.
+        columns = ", ".join(group)
+        rows = self.query(f"""
+            SELECT {columns}, COUNT(*) AS tests, COUNT(time) AS completed, COALESCE(SUM(time), 0) AS time,
+                   COALESCE(SUM(CASE WHEN time IS NOT NULL THEN parsed_time END), 0) AS parsed_time,
+                   CASE WHEN COUNT(CASE WHEN time IS NOT NULL AND COALESCE(parsed_time, solver_time) IS NULL
+                                        THEN 1 END) = 0 AND COUNT(time) > 0
+                        THEN SUM(CASE WHEN time IS NOT NULL THEN COALESCE(parsed_time, solver_time) END) END AS solver,
+                   COALESCE(SUM(cpu), 0) AS cpu, COALESCE(MAX(peak_rss), 0) AS peak_rss,
+                   COALESCE(SUM(launches), 0) AS launches,
+                   COALESCE(SUM(CASE WHEN time IS NOT NULL THEN launches END), 0) AS completed_launches,
+                   COUNT(CASE WHEN time IS NOT NULL AND json_array_length(times) >= 2 THEN 1 END) AS measured
+            FROM this_run WHERE {where} GROUP BY {columns}""", *params)
+        totals = self.query(f"""
+            SELECT {columns}, CAST(r.key AS INTEGER) AS k, SUM(r.value) AS total, COUNT(*) AS tests
+            FROM this_run, json_each(this_run.times) AS r
+            WHERE time IS NOT NULL AND ({where}) GROUP BY {columns}, k ORDER BY k""", *params)
+        summaries = {}
+        for row in rows:
+            key = tuple(row[column] for column in group)
+            samples = [total["total"] for total in totals if tuple(total[column] for column in group) == key and
+                       total["tests"] == row["completed"]]
+            row["stats"] = Stats(samples) if row["measured"] == row["completed"] > 0 and len(samples) > 1 else None
+            summaries[key if len(group) > 1 else key[0]] = row
+        return summaries
+
+    def select(self, run=None):
+        # Points this_run at an earlier run, by default the last run of the script with results
+        if run is None:
+            rows = self.query("SELECT run FROM results WHERE script = ? ORDER BY recorded DESC LIMIT 1", self.script)
+            if not rows:
+                raise ValueError(f"No results of {self.script} in the result store")
+            run = rows[0]["run"]
+        with self.lock, self.connection:
+            self.connection.execute("DROP VIEW this_run")
+            self.connection.execute("CREATE TEMP VIEW this_run AS SELECT * FROM results WHERE run = '{}'".format(
+                run.replace("'", "''")))
+        return run
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class Manifest:
+    # Generated benchmarks with the hash of what they were generated from and the size and mtime they were written
+    # with, a benchmark is written again if either changed
+    def __init__(self, path):
+        self.path = path
+        self.entries = self.load()
+        self.updated = {}
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def hash(source):
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def fresh(self, path, source):
+        entry = self.entries.get(path)
+        if entry is None or entry["hash"] != Manifest.hash(source):
+            return False
+        if entry.get("failed"):
+            # A benchmark that could not be generated is not tried again until its source changes
+            return not os.path.exists(path)
+        if not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        return entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns
+
+    def failed(self, path):
+        return self.updated.get(path, self.entries.get(path, {})).get("failed", False)
+
+    def record(self, path, source, failed=False):
+        if failed:
+            self.updated[path] = {"hash": Manifest.hash(source), "failed": True}
+            return
+        stat = os.stat(path)
+        self.updated[path] = {"hash": Manifest.hash(source), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    def save(self):
+        # Other scripts may have generated benchmarks in the meantime, merge with the manifest on disk
+        entries = self.load()
+        entries.update(self.updated)
+        with Utils.replace_file(self.path) as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+
+
+class Profiler:
+    # Splits every run into phases: the harness around the tool (cache, journal, measurement), the wait for a
+    # --tool-jobs slot, fork and exec, the tool up to its first output (JVM startup), from there to its verdict,
+    # its teardown after the verdict, and the parsing of its output. The time to the verdict is split further with
+    # the clock of the tool: Dartagnan's verification time (encoding and solving) or the solver time of the pooled
+    # mixedproxy, the rest is parsing and compilation of the test. Runs of a worker pool only know the time of the
+    # tool and the overhead of the worker protocol. The main thread of the script runs under cProfile.
+    phases = ["harness", "queue", "worker", "fork", "startup", "compile", "verify", "tool", "teardown", "parse"]
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = []
+        self.lock = threading.Lock()
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def add(self, config, result, total):
+        phases = dict(result.phases)
+        verified = getattr(result, "parsed_time", None)
+        if verified is None:
+            verified = getattr(result, "solver_time", None)
+        if verified is not None and "tool" in phases:
+            # A tool that buffers its output shows its verdict along with its first line, so the time of its own
+            # clock not found between the two is taken from the startup
+            tool = phases.pop("tool")
+            window = phases.get("startup", 0) + tool
+            phases["verify"] = min(verified, window)
+            phases["compile"] = max(tool - phases["verify"], 0)
+            if "startup" in phases:
+                phases["startup"] = window - phases["verify"] - phases["compile"]
+        phases["harness"] = max(total - sum(phases.values()), 0)
+        with self.lock:
+            self.runs.append((Utils.suite(config), config["tool"], phases))
+
+    def report(self):
+        import pstats
+        self.profile.disable()
+        directory = os.path.join(env.OUTPUT_DIR, "profile")
+        os.makedirs(directory, exist_ok=True)
+        self.profile.dump_stats(os.path.join(directory, f"{self.name}.prof"))
+        with open(os.path.join(directory, f"{self.name}.txt"), "w") as f:
+            pstats.Stats(self.profile, stream=f).sort_stats("cumulative").print_stats(40)
+        table = [["Suite", "Tool", "Phase", "Runs", "Total (ms)", "Mean (ms)", "Share"]]
+        groups = {}
+        for suite, tool, phases in self.runs:
+            groups.setdefault((suite, tool), []).append(phases)
+        for (suite, tool), runs in sorted(groups.items()):
+            total = sum([sum(phases.values()) for phases in runs])
+            for phase in Profiler.phases:
+                times = [phases[phase] for phases in runs if phase in phases]
+                if times:
+                    table.append([suite, tool, phase, len(times), f"{sum(times):.0f}", f"{sum(times) / len(times):.1f}",
+                                  f"{sum(times) / max(total, 1e-9):.1%}"])
+        Utils.print_table(f"profile-{self.name}.csv", table)
+        print(f"Profile of the harness written to {directory}/{self.name}.prof and {self.name}.txt")
+
+
+class CostModel:
+    # Predicts the time of a test from earlier runs of the same configuration in the journals, and for
+    # configurations never run from a least-squares fit of log(time) on features of the test. A run out of time or
+    # memory took at least its wall-clock time: a lower bound of the prediction, kept out of the fit. Only the last
+    # runs of a configuration count and results taken from the cache or the journal are left out.
+    window = 5
+    # The size and thread count of every test, see features
+    tests = {}
+
+    def __init__(self, paths):
+        self.history = {}
+        self.bounds = {}
+        self.configs = {}
+        self.lock = threading.Lock()
+        for config, result in CostModel.records(paths):
+            self.add(config, result)
+        samples = {}
+        for key, times in self.history.items():
+            config = self.configs[key]
+            samples.setdefault(config["tool"], []).append((CostModel.features(config),
+                                                           math.log(max(CostModel.median(times), 1))))
+        self.weights = {tool: CostModel.fit(tool_samples) for tool, tool_samples in samples.items()}
+
+    @staticmethod
+    def records(paths):
+        # The runs in the journals, without the results they took from the cache
+        for path in paths:
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    result = Result.from_record(record["result"])
+                    if not result.cached:
+                        yield record["config"], result
+
+    @staticmethod
+    def features(config):
+        test = config["test"]
+        if test not in CostModel.tests:
+            path = test if os.path.isabs(test) else os.path.join(env.DAT3M_HOME, test)
+            size = os.path.getsize(path) if os.path.exists(path) else 1
+            # Generated tests carry their thread count (or grid size) in the name, e.g. IRIW-12.litmus,
+            # xf-barrier-9.spv.dis
+            match = re.search(r'-(\d+)\.[^/]*$', test)
+            CostModel.tests[test] = (math.log(max(size, 1)), int(match[1]) if match is not None else 1)
+        size, threads = CostModel.tests[test]
+        return [1.0, size, config.get("bound", 1), threads]
+
+    @staticmethod
+    def median(values):
+        return sorted(values)[len(values) // 2]
+
+    @staticmethod
+    def fit(samples, ridge=1e-3):
+        n = len(samples[0][0])
+        if len(samples) <= n:
+            return None
+        # Normal equations with a small ridge term, solved by Gaussian elimination
+        a = [[sum(x[i] * x[j] for x, _ in samples) + (ridge if i == j else 0) for j in range(n)] +
+             [sum(x[i] * y for x, y in samples)] for i in range(n)]
+        for i in range(n):
+            pivot = max(range(i, n), key=lambda k: abs(a[k][i]))
+            a[i], a[pivot] = a[pivot], a[i]
+            if a[i][i] == 0:
+                return None
+            for k in range(n):
+                if k != i:
+                    factor = a[k][i] / a[i][i]
+                    a[k] = [v - factor * w for v, w in zip(a[k], a[i])]
+        return [a[i][n] / a[i][i] for i in range(n)]
+
+    def add(self, config, result):
+        key = Journal.key(config)
+        with self.lock:
+            if result.time is not None:
+                self.history.setdefault(key, deque(maxlen=CostModel.window)).append(result.time)
+                self.configs[key] = config
+            elif getattr(result, "wall", None) is not None:
+                self.bounds[key] = max(self.bounds.get(key, 0), result.wall)
+
+    def predict(self, config):
+        key = Journal.key(config)
+        with self.lock:
+            times = self.history.get(key)
+            bound = self.bounds.get(key)
+        if times:
+            return max(CostModel.median(times), bound or 0)
+        weights = self.weights.get(config["tool"])
+        if weights is None:
+            return bound
+        fitted = math.exp(sum(w * x for w, x in zip(weights, CostModel.features(config))))
+        return max(fitted, bound or 0)
+
+
+class HeapModel:
+    # Predicts the heap of a java tool for a test: what the last runs of the same configuration in the journals
+    # needed, 1.5 times their peak RSS or twice the heap they ran out of, and for configurations never run a
+    # least-squares fit of log(heap) on the features of the test, see CostModel. Heaps are powers of two between
+    # minimum and maximum.
+    minimum = 256 << 20
+
+    def __init__(self, paths, maximum, default):
+        self.maximum = maximum
+        self.default = min(default, maximum)
+        self.history = {}
+        # The configuration and heap of the last completed run of every configuration
+        self.samples = {}
+        self.lock = threading.Lock()
+        for config, result in CostModel.records(paths):
+            self.add(config, result)
+        samples = {}
+        for config, needed in self.samples.values():
+            samples.setdefault(config["tool"], []).append((CostModel.features(config), math.log(needed)))
+        self.weights = {tool: CostModel.fit(tool_samples) for tool, tool_samples in samples.items()}
+
+    @staticmethod
+    def needed(result):
+        # In bytes, None if the run says nothing about the heap
+        if result.status == "OOM" and result.heap is not None:
+            return 2 * result.heap * (1 << 20)
+        if result.time is not None and result.peak_rss is not None:
+            return 1.5 * result.peak_rss * (1 << 20)
+        return None
+
+    def add(self, config, result):
+        needed = HeapModel.needed(result)
+        if needed is None:
+            return
+        key = Journal.key(config)
+        with self.lock:
+            self.history.setdefault(key, deque(maxlen=CostModel.window)).append(needed)
+            if result.time is not None:
+                self.samples[key] = (config, needed)
+
+    def predict(self, config):
+        with self.lock:
+            needed = max(self.history.get(Journal.key(config), [0]))
+        if needed == 0:
+            weights = self.weights.get(config["tool"])
+            if weights is None:
+                return self.default
+            needed = math.exp(sum(w * x for w, x in zip(weights, CostModel.features(config))))
+        return self.round(needed)
+
+    def round(self, heap):
+        return min(max(1 << math.ceil(math.log2(max(heap, 1))), self.minimum), self.maximum)
+
+
+class WorkerError(Exception):
+    pass
+
+
+class WorkerPool:
+    header = "@@WORKER"
+
+    def __init__(self, command, size, cwd=None):
+        self.command = command
+        self.cwd = cwd
+        self.size = size
+        self.started = 0
+        # Set once a worker exited by itself, the tool then runs in separate processes
+        self.error = None
+        self.lock = threading.Lock()
+        self.workers = queue.Queue()
+
+    def get_worker(self):
+        # Workers are started on first use, scripts that never run the tool do not pay for the JVMs
+        with self.lock:
+            if self.workers.empty() and self.started < self.size:
+                self.started += 1
+                return self.start_worker()
+        return self.workers.get()
+
+    def start_worker(self):
+        return subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, cwd=self.cwd)
+
+    def run(self, args, timeout=None, cpus=None, parser=None):
+        if self.error is not None:
+            raise WorkerError(self.error)
+        worker = self.get_worker()
+        if cpus is not None:
+            WorkerPool.pin(worker.pid, cpus)
+        # Set by the timer before it kills the worker, any other worker that dies crashed or exited
+        expired = threading.Event()
+        timer = threading.Timer(timeout, WorkerPool.expire, [worker, expired]) if timeout is not None else None
+        process = psutil.Process(worker.pid) if psutil is not None else None
+        try:
+            # The JVM lives on between jobs, its peak RSS is reset to measure that of this job
+            peak = WorkerPool.reset_peak_rss(worker.pid)
+            if timer is not None:
+                timer.start()
+            start = time.monotonic()
+            before = process.cpu_times() if process is not None else None
+            worker.stdin.write(("\t".join(args) + "\n").encode("utf-8"))
+            worker.stdin.flush()
+            header = worker.stdout.readline().decode("utf-8").split()
+            if len(header) < 5 or header[0] != self.header:
+                raise WorkerError(f"Worker terminated unexpectedly: {' '.join(self.command)}")
+            status, millis, out_size, err_size = (int(x) for x in header[1:5])
+            # The payload goes line by line through the parser into the tails, as the output of a separate process
+            parse = 0
+            tails = {}
+            for stream, size in (("out", out_size), ("err", err_size)):
+                tails[stream] = deque(maxlen=Result.tail_lines)
+                while size > 0:
+                    raw = worker.stdout.readline(min(size, Utils.max_line))
+                    if not raw:
+                        raise WorkerError(f"Worker terminated unexpectedly: {' '.join(self.command)}")
+                    size -= len(raw)
+                    line = raw.decode("utf-8", errors="replace")
+                    tails[stream].append(line)
+                    if parser is not None:
+                        now = time.monotonic()
+                        parser.feed(line, stream)
+                        parse += time.monotonic() - now
+            wall = (time.monotonic() - start) * 1000
+            WorkerPool.cancel(timer)
+            execution = Execution("".join(tails["out"]), "".join(tails["err"]), status, False, wall, parser=parser,
+                                  phases={"tool": millis, "worker": max(wall - millis - parse * 1000, 0),
+                                          "parse": parse * 1000})
+            # Workers that can tell the time spent in the solver send it as an extra field
+            execution.solver_time = int(header[5]) if len(header) > 5 else None
+            if process is not None:
+                after = process.cpu_times()
+                execution.cpu_user = (after.user - before.user) * 1000
+                execution.cpu_system = (after.system - before.system) * 1000
+            if peak:
+                execution.peak_rss = WorkerPool.peak_rss(worker.pid)
+            if status != 0 or expired.is_set():
+                # Restart after a failed job, the heap of the worker may be exhausted
+                self.stop_worker(worker)
+                worker = self.start_worker()
+            return execution
+        except (OSError, ValueError, WorkerError):
+            WorkerPool.cancel(timer)
+            code = WorkerPool.exit_code(worker)
+            self.stop_worker(worker)
+            if expired.is_set():
+                worker = self.start_worker()
+                raise TimeoutError(f"Worker exceeded {timeout} s")
+            if code is not None and code >= 0:
+                # A worker that crashed was killed by a signal, one that exited by itself ran a tool calling
+                # System.exit, which would end every worker: the pool is given up with a single message
+                worker = None
+                with self.lock:
+                    first = self.error is None
+                    if first:
+                        self.error = f"Worker exited with status {code} running {args[0]}: {' '.join(self.command)}"
+                if first:
+                    print(f"{self.error}, running the tool in separate processes")
+                raise WorkerError(self.error)
+            worker = self.start_worker()
+            raise WorkerError(f"Worker terminated unexpectedly: {' '.join(self.command)}")
+        finally:
+            WorkerPool.cancel(timer)
+            if worker is not None:
+                self.workers.put(worker)
+
+    @staticmethod
+    def expire(worker, expired):
+        expired.set()
+        worker.kill()
+
+    @staticmethod
+    def cancel(timer):
+        # Once cancelled, a timer that already fired has also killed its worker
+        if timer is not None:
+            timer.cancel()
+            if timer.is_alive():
+                timer.join()
+
+    @staticmethod
+    def exit_code(worker):
+        try:
+            return worker.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            return None
+
+    @staticmethod
+    def reset_peak_rss(pid):
+        # Writing 5 to clear_refs resets VmHWM, the peak RSS of the process (Linux 4.0)
+        try:
+            with open(f"/proc/{pid}/clear_refs", "w") as f:
+                f.write("5")
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def peak_rss(pid):
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def pin(pid, cpus):
+        # Affinity is per thread and inherited only by threads started later, so the threads a JVM already runs
+        # are pinned one by one, as are those of its child processes
+        pids = [pid]
+        if psutil is not None:
+            try:
+                pids += [child.pid for child in psutil.Process(pid).children(recursive=True)]
+            except psutil.Error:
+                pass
+        for process in pids:
+            try:
+                threads = os.listdir(f"/proc/{process}/task")
+            except OSError:
+                continue
+            for thread in threads:
+                try:
+                    os.sched_setaffinity(int(thread), cpus)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def stop_worker(worker):
+        try:
+            worker.stdin.close()
+        except OSError:
+            pass
+        try:
+            worker.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+            worker.wait()
+
+    def close(self):
+        while not self.workers.empty():
+            self.stop_worker(self.workers.get())
+
+
+class Runner:
+    # One event loop in a background thread runs the tools of all tests, reading their output through async
+    # streams. Coroutines such as Utils.spawn are handed to it with run (blocking, for the executor threads) or
+    # submit (a future, to start many runs at once and wait for them together).
+    def __init__(self, limits=None):
+        self.limits = limits or {}
+        self.semaphores = {}
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        # The tools of a script are run by one event loop, asyncio is imported with the first tool run
+        import asyncio
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        return self.loop
+
+    def submit(self, coroutine):
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(coroutine, self.start())
+
+    def run(self, coroutine):
+        return self.submit(coroutine).result()
+
+    def semaphore(self, tool):
+        # Created on first use in the loop, a tool without a limit shares the unbounded null context
+        import asyncio
+        if tool not in self.semaphores:
+            limit = self.limits.get(tool, self.limits.get(None))
+            self.semaphores[tool] = asyncio.Semaphore(int(limit)) if limit is not None else contextlib.nullcontext()
+        return self.semaphores[tool]
+
+    @staticmethod
+    async def wait(pid):
+        # wait4 instead of the child watcher of asyncio to get the resource usage of the tool and its waited-for
+        # children; the pidfd tells when it exited without blocking the loop
+        import asyncio
+        loop = asyncio.get_running_loop()
+        try:
+            fd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            _, status, usage = await loop.run_in_executor(None, os.wait4, pid, 0)
+            return status, usage
+        exited = loop.create_future()
+        loop.add_reader(fd, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+        _, status, usage = os.wait4(pid, 0)
+        return status, usage
+
+
+class Job:
+    def __init__(self, run, *args, memory=None, **kwargs):
+        self.run = run
+        self.args = args
+        self.kwargs = kwargs
+        self.memory = memory
+
+    def __call__(self):
+        return self.run(*self.args, **self.kwargs)
+
+
+class Tool:
+    # Adapter of a verification tool, registered by name. config turns the arguments of a job into the configuration
+    # its result is cached and journaled under, files are the tool files the result depends on, command the arguments
+    # of a run in a separate process (in cwd), and workers the worker pool and the arguments of a pooled run, if
+    # there is a pool. The output is parsed by result. Resources: java tools are JVMs, memory (in bytes) is reserved
+    # by each job of the tool instead of --job-memory.
+    registry = {}
+
+    def __init__(self, name, result, config, files, command, cwd=None, workers=None, path=None, java=False,
+                 memory=None):
+        self.name = name
+        self.result = result
+        self.config = config
+        self.files = files
+        self.command = command
+        self.cwd = cwd
+        self.workers = workers
+        self.path = path
+        self.java = java
+        self.memory = memory
+        Tool.registry[name] = self
+
+    @staticmethod
+    def of(job):
+        tool = getattr(job.run, "__self__", None)
+        return tool if isinstance(tool, Tool) else None
+
+    def job(self, *args, **kwargs):
+        # A java tool reserves the heap predicted for the test
+        heap = Utils.heap(self.config(*args, **kwargs)) if self.java else None
+        return Job(self.run, *args, memory=heap if heap is not None else self.memory, **kwargs)
+
+    def run(self, *args, **kwargs):
+        config = self.config(*args, **kwargs)
+        test = self.path(config["test"]) if self.path is not None else config["test"]
+        return Utils.run_test(config, test, self.files(config), lambda: self.execute(config))
+
+    def execute(self, config):
+        test = config["test"]
+        heap = Utils.heap(config) if self.java else None
+        pooled = self.workers(config) if self.workers is not None else None
+        # A pool given up on (see WorkerPool.error) has said so once, its tests silently run in separate processes
+        if pooled is not None and pooled[0].error is None:
+            workers, args = pooled
+            start = time.monotonic()
+            try:
+                result = self.result.of(workers.run(args, Utils.limit(Utils.timeouts, self.name), Utils.pinned_cpus(),
+                                                    self.result.Parser()))
+            except TimeoutError:
+                return self.result.of(Execution("", "", None, True, (time.monotonic() - start) * 1000))
+            except WorkerError as e:
+                print(f"{e}, rerunning {test} in a separate process")
+            else:
+                # The JVMs of a pool share the -Xmx of _JAVA_OPTIONS, a test out of that heap gets a larger one
+                result.heap = Executor.java_heap() >> 20
+                if result.status != "OOM" or heap is None or Executor.java_heap() >= Utils.heap_model.maximum:
+                    return result
+                Utils.heap_model.add(config, result)
+                heap = Utils.heap_model.round(max(heap, 2 * Executor.java_heap()))
+                print(f"{test} ran out of memory in a worker, rerunning it with a {heap >> 20} MB heap")
+        while True:
+            if heap is not None:
+                Utils.executor.reserve(heap)
+            result = self.result.of(Utils.run_command(self.command(config), self.cwd, self.name, self.result.Parser(),
+                                                      test, heap))
+            if self.java:
+                result.heap = (heap if heap is not None else Executor.java_heap()) >> 20
+            # Out of memory is the limit of the tool only with the largest heap
+            if result.status != "OOM" or heap is None or heap >= Utils.heap_model.maximum:
+                return result
+            # Later runs of the test, e.g. with --repeat, start with the larger heap
+            Utils.heap_model.add(config, result)
+            larger = min(2 * heap, Utils.heap_model.maximum)
+            print(f"{test} ran out of memory with a {heap >> 20} MB heap, retrying with {larger >> 20} MB")
+            heap = larger
+
+
+class Executor:
+    sizes = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+
+    def __init__(self, jobs=1, memory=None, job_memory=None, cost=None, remote=None):
+        self.jobs = jobs if jobs > 0 else os.cpu_count()
+        self.memory = memory if memory is not None else Executor.physical_memory()
+        self.job_memory = job_memory if job_memory is not None else Executor.java_heap()
+        self.cost = cost
+        self.remote = remote
+        self.used = 0
+        self.reserved = threading.local()
+        self.condition = threading.Condition()
+        self.wall = 0
+        self.predicted = {}
+
+    @staticmethod
+    def parse_size(size):
+        size = size.strip().lower()
+        if size[-1] in Executor.sizes:
+            return int(float(size[:-1]) * Executor.sizes[size[-1]])
+        return int(size)
+
+    @staticmethod
+    def physical_memory():
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+    @staticmethod
+    def java_heap():
+        # Every JVM may grow up to the -Xmx set for the image, see _JAVA_OPTIONS in the Dockerfile
+        match = re.search(r'-Xmx(\d+[kKmMgGtT]?)', os.environ.get("_JAVA_OPTIONS", ""))
+        return Executor.parse_size(match[1]) if match is not None else 4 << 30
+
+    def acquire(self, memory):
+        memory = min(memory, self.memory)
+        with self.condition:
+            self.condition.wait_for(lambda: self.used + memory <= self.memory)
+            self.used += memory
+        return memory
+
+    def release(self, memory):
+        with self.condition:
+            self.used -= memory
+            self.condition.notify_all()
+
+    def execute(self, job):
+        if self.remote is not None:
+            # Remote workers reserve the memory of their jobs on their own nodes
+            return self.remote(job)
+        self.reserved.memory = self.acquire(job.memory if job.memory is not None else self.job_memory)
+        try:
+            return job()
+        finally:
+            self.release(self.reserved.memory)
+            self.reserved.memory = None
+
+    def reserve(self, memory):
+        # A running job growing its reservation, e.g. a JVM retried with a larger heap. What it holds is given up while
+        # it waits, so that jobs growing at the same time cannot block each other.
+        held = getattr(self.reserved, "memory", None)
+        if held is not None and memory > held:
+            self.release(held)
+            self.reserved.memory = 0
+            self.reserved.memory = self.acquire(memory)
+
+    def run(self, groups, stop=None):
+        # Results are returned in the order of the groups regardless of completion order. If stop holds for a
+        # result, later jobs of its group are dropped, so with stop a group only releases its next job once the
+        # previous one started. Among the released jobs the one predicted to take longest starts first, as the
+        # longest jobs started last decide the makespan; jobs without a prediction are assumed to be long.
+        start = time.monotonic()
+        results = {name: [None] * len(jobs) for name, jobs in groups.items()}
+        limits = {name: len(jobs) for name, jobs in groups.items()}
+        self.predicted = {(name, i): self.cost(job) if self.cost is not None else None
+                          for name, jobs in groups.items() for i, job in enumerate(jobs)}
+        order = {key: position for position, key in enumerate(self.predicted)}
+        released = set()
+        for name, jobs in groups.items():
+            released.update([(name, i) for i in range(len(jobs) if stop is None else min(len(jobs), 1))])
+        running = {}
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while released or running:
+                while released and len(running) < self.jobs:
+                    name, i = min(released, key=lambda key: (self.predicted[key] is not None,
+                                                             -(self.predicted[key] or 0), order[key]))
+                    released.remove((name, i))
+                    if stop is not None and i + 1 < len(groups[name]):
+                        released.add((name, i + 1))
+                    if i < limits[name]:
+                        running[pool.submit(self.execute, groups[name][i])] = (name, i)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, i = running.pop(future)
+                    results[name][i] = future.result()
+                    if stop is not None and stop(results[name][i]):
+                        limits[name] = min(limits[name], i + 1)
+        self.wall = (time.monotonic() - start) * 1000
+        return {name: results[name][:limits[name]] for name in results}
+
+    def makespan(self, costs):
+        # Longest-first list scheduling on the slots the memory budget admits
+        slots = [0] * max(1, min(self.jobs, self.memory // self.job_memory))
+        for cost in sorted(costs, reverse=True):
+            slots[slots.index(min(slots))] += cost
+        return max(slots)
+
+
+class Coordinator:
+    # Hands jobs to remote workers (remote-worker.py) over TCP, a worker opens one connection per job it runs at a
+    # time. Messages are lines of JSON: a job is the name of a registered tool and its arguments (see Tool, workers
+    # run only registered tools), the reply is the record of its result. While a job runs its worker sends
+    # heartbeats; a job whose worker disconnects or falls silent is queued again ahead of the jobs not yet started.
+    # After losing a worker `attempts` times it fails with WorkerError, and Utils.run_remote runs it on the
+    # coordinator instead.
+    heartbeat = 10
+    attempts = 3
+
+    def __init__(self, address):
+        import socket
+        host, _, port = address.rpartition(":")
+        self.server = socket.create_server((host, int(port)))
+        self.address = f"{host or '*'}:{self.server.getsockname()[1]}"
+        self.pending = deque()
+        self.connections = set()
+        self.closed = False
+        self.condition = threading.Condition()
+        threading.Thread(target=self.accept, daemon=True).start()
+        print(f"Waiting for workers on {self.address}")
+
+    @staticmethod
+    def keepalive(connection):
+        import socket
+        connection.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return connection
+
+    @staticmethod
+    def send(connection, message):
+        connection.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+    def accept(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.serve, args=(Coordinator.keepalive(connection),), daemon=True).start()
+
+    def take(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending or self.closed)
+            return self.pending.popleft() if not self.closed else None
+
+    def serve(self, connection):
+        with self.condition:
+            self.connections.add(connection)
+        connection.settimeout(3 * Coordinator.heartbeat)
+        reader = connection.makefile("r", encoding="utf-8")
+        task = None
+        try:
+            host, port = connection.getpeername()[:2]
+            peer = f"{host}:{port}"
+            while True:
+                task = self.take()
+                if task is None:
+                    return
+                Coordinator.send(connection, task[0])
+                message = {"heartbeat": True}
+                while "heartbeat" in message:
+                    line = reader.readline()
+                    if not line:
+                        raise OSError("connection closed")
+                    message = json.loads(line)
+                message["worker"] = peer
+                task[1].set_result(message)
+                task = None
+        except (OSError, ValueError) as e:
+            if task is not None:
+                self.requeue(task, f"{e}")
+        finally:
+            with self.condition:
+                self.connections.discard(connection)
+            connection.close()
+
+    def requeue(self, task, reason):
+        message, future, attempts = task
+        if attempts + 1 >= Coordinator.attempts:
+            future.set_exception(WorkerError(f"Lost {attempts + 1} workers running {message['args'][0]} ({reason})"))
+            return
+        print(f"Lost the worker running {message['args'][0]} ({reason}), queueing it again")
+        with self.condition:
+            self.pending.appendleft((message, future, attempts + 1))
+            self.condition.notify()
+
+    def run(self, job):
+        from concurrent.futures import Future
+        future = Future()
+        with self.condition:
+            self.pending.append(({"tool": Tool.of(job).name, "args": list(job.args), "kwargs": job.kwargs}, future, 0))
+            self.condition.notify()
+        reply = future.result()
+        if "error" in reply:
+            raise WorkerError(f"Remote job failed on {reply['worker']}: {reply['error']}")
+        return reply
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            connections = list(self.connections)
+        import socket
+        self.server.close()
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
 class Utils:
+    dartagnan_workers = None
+    alloy_ptx_workers = None
+    alloy_vkn_workers = None
+    alloy_vkn_lock = threading.Lock()
+    alloy_vkn_prepared = {}
+    executor = Executor()
+    cache = None
+    journal = None
+    cost_model = None
+    heap_model = None
+    store = None
+    coordinator = None
+    profiler = None
+    runner = Runner()
+    timeouts = {}
+    cpu_limits = {}
+    gc_time = False
+    log_dir = None
+    stop_at_verdict = False
+    warmup = 0
+    repeat = 1
+    pin_cpus = None
+    cpu_slots = None
+    pinned = threading.local()
+    max_line = 1 << 16
+    suites = ["PTX6.0", "PTX7.5", "Vulkan", "GPUVerify", "Locks", "Scaling"]
+    re_gc_pause = re.compile(r'Pause .* (\d+(?:\.\d+)?)ms$')
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument("--dartagnan-workers", dest="dartagnan_workers", type=int, default=0,
+                            help="run dartagnan in a pool of long-lived JVMs of the given size")
+        parser.add_argument("--dartagnan-worker-command", dest="dartagnan_worker_command",
+                            help="command starting a dartagnan worker (e.g. the stub worker)")
+        parser.add_argument("--alloy-ptx-workers", dest="alloy_ptx_workers", type=int, default=0,
+                            help="run mixedproxy in a pool of long-lived python workers of the given size, which "
+                                 "also reports translator and solver time apart")
+        parser.add_argument("--per-process", dest="per_process", action="store_true",
+                            help="run every vulkan alloy test with its own make and JVM instead of generating all "
+                                 "tests up front and running them in long-lived RunCommandLine JVMs")
+        parser.add_argument("--alloy-vkn-worker-command", dest="alloy_vkn_worker_command",
+                            help="command starting a vulkan alloy worker (e.g. the stub worker)")
+        parser.add_argument("--jobs", dest="jobs", type=int, default=1,
+                            help="number of tests run concurrently (0 for all cores)")
+        parser.add_argument("--memory-budget", dest="memory_budget",
+                            help="memory available to concurrent tests, e.g. 64g (default physical memory)")
+        parser.add_argument("--job-memory", dest="job_memory",
+                            help="memory reserved per test, e.g. 4g (default -Xmx from _JAVA_OPTIONS)")
+        parser.add_argument("--max-heap", dest="max_heap",
+                            help="size the heap of every run of a java tool from earlier runs and retry a run out of "
+                                 "memory with twice the heap, up to this size, e.g. 32g")
+        parser.add_argument("--schedule", dest="schedule", choices=["longest", "order"], default="longest",
+                            help="start the tests predicted to take longest first (from the journals of earlier "
+                                 "runs), or in the order of the script")
+        parser.add_argument("--no-cache", dest="cache", action="store_const", const="off", default="on",
+                            help="always run the tools and do not store results")
+        parser.add_argument("--refresh", dest="cache", action="store_const", const="refresh",
+                            help="always run the tools and replace cached results")
+        parser.add_argument("--fresh-timings", dest="cache", action="store_const", const="timing",
+                            help="serve cached verdicts, but rerun the tools for timings")
+        parser.add_argument("--cache-max-size", dest="cache_max_size", default="1g",
+                            help="size of the result cache before the oldest entries are evicted")
+        parser.add_argument("--cache-max-age", dest="cache_max_age", type=float, default=30,
+                            help="days after which cached results are evicted")
+        parser.add_argument("--resume", dest="resume", action="store_true",
+                            help="skip tests already recorded in the journal of the previous run")
+        parser.add_argument("--timeout", dest="timeouts", action="append", default=[], metavar="[TOOL=]SECONDS",
+                            help="wall-clock limit per test, for all tools or for one of "
+                                 "dartagnan, alloy-ptx, alloy-vkn, gpuverify (repeatable)")
+        parser.add_argument("--tool-jobs", dest="tool_jobs", action="append", default=[], metavar="[TOOL=]N",
+                            help="number of processes of a tool run at once, for all tools or for one tool "
+                                 "(repeatable, default --jobs)")
+        parser.add_argument("--cpu-limit", dest="cpu_limits", action="append", default=[], metavar="[TOOL=]SECONDS",
+                            help="CPU-time limit per test, for all tools or for one tool (repeatable)")
+        parser.add_argument("--gc-time", dest="gc_time", action="store_true",
+                            help="record the garbage collection pauses of java tools")
+        parser.add_argument("--log-dir", dest="log_dir",
+                            help="write the full output of every tool run to this directory "
+                                 f"(only the last {Result.tail_lines} lines are kept in memory)")
+        parser.add_argument("--stop-at-verdict", dest="stop_at_verdict", action="store_true",
+                            help="stop a tool as soon as its output contains the verdict")
+        parser.add_argument("--warmup", dest="warmup", type=int, default=0,
+                            help="runs of every test before the measured ones, their results are discarded")
+        parser.add_argument("--repeat", dest="repeat", type=int, default=1,
+                            help="measured runs of every test, the times show the median and its 95%% confidence "
+                                 "interval")
+        parser.add_argument("--pin-cpus", dest="pin_cpus", metavar="CPUS",
+                            help="run the tests on these CPUs, e.g. 2-15 or all, split into disjoint sets for the "
+                                 "concurrent tests")
+        parser.add_argument("--coordinator", dest="coordinator", metavar="[HOST:]PORT",
+                            help="run the tests on remote workers (remote-worker.py) connecting to this address; "
+                                 "--jobs is then the number of tests handed out at once, set it to at least the "
+                                 "number of jobs of all workers")
+        parser.add_argument("--profile", dest="profile", action="store_true",
+                            help="split every run into phases (harness, fork, JVM startup, compilation, verification, "
+                                 "teardown, parsing) per suite in profile-<script>.csv and profile the script itself")
+        parser.add_argument("--unstable-threshold", dest="unstable_threshold", type=float, default=Stats.threshold,
+                            help="flag measurements whose interquartile range exceeds this fraction of the median")
+
+    @staticmethod
+    def parse_limits(values):
+        limits = {}
+        for value in values:
+            tool, _, seconds = value.rpartition("=")
+            limits[tool if tool else None] = float(seconds)
+        return limits
+
+    @staticmethod
+    def parse_numbers(value):
+        # Lists and ranges such as 1-4 or 1,2,8-10
+        numbers = []
+        for part in value.split(","):
+            first, _, last = part.partition("-")
+            numbers += range(int(first), int(last or first) + 1)
+        return sorted(set(numbers))
+
+    @staticmethod
+    def parse_cpus(value):
+        if value == "all":
+            return sorted(os.sched_getaffinity(0))
+        return Utils.parse_numbers(value)
+
+    @staticmethod
+    def limit(limits, tool):
+        return limits.get(tool, limits.get(None))
+
+    @staticmethod
+    def configure(args, tools=True):
+        # Generating benchmarks or rendering earlier results runs no tool (tools=False): the journal, store, cost and
+        # heap models, worker pools and cache are left out
+        Utils.timeouts = Utils.parse_limits(args.timeouts)
+        Utils.cpu_limits = Utils.parse_limits(args.cpu_limits)
+        Utils.runner = Runner(Utils.parse_limits(args.tool_jobs))
+        Utils.gc_time = args.gc_time
+        Utils.log_dir = args.log_dir
+        Utils.stop_at_verdict = args.stop_at_verdict
+        Utils.pin_cpus = args.pin_cpus
+        Utils.warmup = args.warmup
+        Utils.repeat = max(1, args.repeat)
+        Stats.threshold = args.unstable_threshold
+        name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+        if args.profile:
+            Utils.profiler = Profiler(name)
+            atexit.register(Utils.profiler.report)
+        if tools:
+            Utils.journal = Journal(os.path.join(env.OUTPUT_DIR, "journal", f"{name}.jsonl"), args.resume)
+            atexit.register(Utils.journal.close)
+            Utils.open_store(name)
+        if tools and args.schedule == "longest":
+            Utils.cost_model = CostModel(Utils.list_files(os.path.join(env.OUTPUT_DIR, "journal"), ".jsonl"))
+        if tools and args.max_heap is not None:
+            Utils.heap_model = HeapModel(Utils.list_files(os.path.join(env.OUTPUT_DIR, "journal"), ".jsonl"),
+                                         Executor.parse_size(args.max_heap), Executor.java_heap())
+        if tools and args.coordinator is not None:
+            Utils.coordinator = Coordinator(args.coordinator)
+            atexit.register(Utils.coordinator.close)
+        Utils.executor = Executor(
+            args.jobs,
+            Executor.parse_size(args.memory_budget) if args.memory_budget is not None else None,
+            Executor.parse_size(args.job_memory) if args.job_memory is not None else None,
+            Utils.predict if Utils.cost_model is not None else None,
+            Utils.run_remote if Utils.coordinator is not None else None)
+        if not tools:
+            return
+        if args.pin_cpus is not None:
+            # Every concurrent test gets its own CPUs, they are shared only if there are fewer CPUs than jobs
+            cpus = Utils.parse_cpus(args.pin_cpus)
+            jobs = Utils.executor.jobs
+            Utils.cpu_slots = queue.Queue()
+            for k in range(jobs):
+                Utils.cpu_slots.put(cpus[k * len(cpus) // jobs:(k + 1) * len(cpus) // jobs] or [cpus[k % len(cpus)]])
+        if args.dartagnan_workers > 0:
+            if args.dartagnan_worker_command is not None:
+                command = shlex.split(args.dartagnan_worker_command)
+            else:
+                command = ["java", "-cp", f"dartagnan/target/dartagnan.jar:{env.WORKER_DIR}",
+                           "Worker", "com.dat3m.dartagnan.Dartagnan"]
+            Utils.dartagnan_workers = WorkerPool(command, args.dartagnan_workers, cwd=env.DAT3M_HOME)
+            atexit.register(Utils.dartagnan_workers.close)
+        if args.alloy_ptx_workers > 0:
+            command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "alloy-ptx-worker.py")]
+            Utils.alloy_ptx_workers = WorkerPool(command, args.alloy_ptx_workers, cwd=env.ALLOY_PTX_HOME)
+            atexit.register(Utils.alloy_ptx_workers.close)
+        if not args.per_process:
+            if args.alloy_vkn_worker_command is not None:
+                command = shlex.split(args.alloy_vkn_worker_command)
+            else:
+                command = ["java", "-cp", f"{env.ALLOY_VKN_JAR}:.:{env.WORKER_DIR}", "Worker", "RunCommandLine"]
+            # One JVM per concurrent test, a single one with the default --jobs 1
+            Utils.alloy_vkn_workers = WorkerPool(command, Utils.executor.jobs, cwd=env.ALLOY_VKN_HOME)
+            atexit.register(Utils.alloy_vkn_workers.close)
+        if args.cache != "off":
+            Utils.cache = ResultCache(env.CACHE_DIR, args.cache, Executor.parse_size(args.cache_max_size),
+                                      args.cache_max_age)
+            Utils.cache.evict()
+            atexit.register(Utils.cache.evict)
+
+    @staticmethod
+    def open_store(name=None):
+        if Utils.store is None:
+            name = name or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+            Utils.store = ResultStore(os.path.join(env.OUTPUT_DIR, "results.sqlite"), name)
+            atexit.register(Utils.store.close)
+        return Utils.store
+
+    @staticmethod
+    @contextlib.contextmanager
+    def replace_file(path):
+        # Readers never see a partially written file, an interrupted write keeps the previous one
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                yield f
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @staticmethod
+    def write_lines(path, lines):
+        with Utils.replace_file(path) as f:
+            for i, line in enumerate(lines):
+                if i > 0:
+                    f.write("\n")
+                f.write(line)
+
+    @staticmethod
+    def generate(tasks):
+        # Tasks are (path, source, write, args): write(*args) creates the benchmark at path, source is what it is
+        # generated from. Only missing or outdated benchmarks are written, spread over --jobs processes. A write
+        # returning False could not create its benchmark, the paths of all such benchmarks are returned.
+        manifest = Manifest(os.path.join(env.BENCHMARKS_DIR, "manifest.json"))
+        stale = [task for task in tasks if not manifest.fresh(task[0], task[1])]
+        if Utils.executor.jobs > 1 and len(stale) > 1:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=Utils.executor.jobs) as pool:
+                futures = {pool.submit(write, *args): (path, source) for path, source, write, args in stale}
+                for future in as_completed(futures):
+                    manifest.record(*futures[future], failed=future.result() is False)
+        else:
+            for path, source, write, args in stale:
+                manifest.record(path, source, failed=write(*args) is False)
+        if stale:
+            manifest.save()
+        failed = {task[0] for task in tasks if manifest.failed(task[0])}
+        print(f"Generated {len(stale)} benchmarks, {len(tasks) - len(stale)} up to date" +
+              (f", {len(failed)} failed" if failed else ""))
+        return failed
+
     @staticmethod
     def list_files(path, ext):
         return [os.path.join(dp, f) for dp, dn, filenames in os.walk(path) for f in filenames if f.endswith(ext)]
 
     @staticmethod
-    def run_command(command):
-        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True) as p:
-            out, err = p.communicate()
-        return out.decode("utf-8"), err.decode("utf-8")
+    def run_command(args, cwd=None, tool=None, parser=None, name=None, heap=None):
+        # Synchronous wrapper of spawn for the executor threads, the CPUs pinned to the calling thread go with it
+        return Utils.runner.run(Utils.spawn(args, cwd, tool, parser, name, Utils.pinned_cpus(), heap))
+
+    @staticmethod
+    async def spawn(args, cwd=None, tool=None, parser=None, name=None, cpus=None, heap=None):
+        # Runs the argument list of a tool without a shell; CPU limit and pinning are applied by prlimit and taskset,
+        # which exec the tool, the heap (in bytes) of a java tool replaces the -Xmx of _JAVA_OPTIONS. At most
+        # --tool-jobs runs of a tool are started at once.
+        start = time.monotonic()
+        async with Utils.runner.semaphore(tool):
+            queued = (time.monotonic() - start) * 1000
+            execution = await Utils.execute_command(args, cwd, tool, parser, name, cpus, heap)
+        execution.phases["queue"] = queued
+        return execution
+
+    @staticmethod
+    async def execute_command(args, cwd, tool, parser, name, cpus, heap):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        timeout = Utils.limit(Utils.timeouts, tool)
+        cpu_limit = Utils.limit(Utils.cpu_limits, tool)
+        if cpu_limit is not None:
+            # SIGXCPU at the soft limit, SIGKILL at the hard limit if the tool ignores SIGXCPU
+            args = ["prlimit", f"--cpu={math.ceil(cpu_limit)}:{math.ceil(cpu_limit) + 5}", "--"] + args
+        if cpus is not None:
+            args = ["taskset", "-c", ",".join(map(str, cpus))] + args
+        environment = None
+        gc_log = None
+        options = os.environ.get("_JAVA_OPTIONS", "")
+        if heap is not None:
+            options = re.sub(r'-Xmx\S+', "", options) + f" -Xmx{heap >> 20}m"
+        if Utils.gc_time and tool in Tool.registry and Tool.registry[tool].java:
+            gc_log = tempfile.mkdtemp(prefix="gc-")
+            options += f" -Xlog:gc:file={gc_log}/gc-%p.log"
+        if heap is not None or gc_log is not None:
+            environment = dict(os.environ, _JAVA_OPTIONS=" ".join(options.split()))
+        expired = False
+        decided = False
+        marks = {"first": None, "last": None, "verdict": None, "parse": 0}
+        tails = {"out": deque(maxlen=Result.tail_lines), "err": deque(maxlen=Result.tail_lines)}
+        logs = Utils.open_logs(shlex.join(args), tool, name) if Utils.log_dir is not None else {}
+
+        async def capture(pipe, stream):
+            nonlocal decided
+            reader = asyncio.StreamReader(limit=Utils.max_line)
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+            while True:
+                # Bounded lines so that a tool printing without newlines cannot grow a single line without limit
+                try:
+                    raw = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    raw = e.partial
+                except asyncio.LimitOverrunError as e:
+                    raw = await reader.readexactly(e.consumed)
+                if not raw:
+                    return
+                line = raw.decode("utf-8", errors="replace")
+                now = time.monotonic()
+                marks["first"] = marks["first"] or now
+                marks["last"] = now
+                tails[stream].append(line)
+                if stream in logs:
+                    logs[stream].write(line)
+                if parser is not None:
+                    parser.feed(line, stream)
+                    marks["parse"] += time.monotonic() - now
+                    if parser.done and marks["verdict"] is None:
+                        marks["verdict"] = now
+                    if Utils.stop_at_verdict and parser.done and not decided:
+                        decided = True
+                        Utils.kill_group(p)
+
+        def expire():
+            nonlocal expired
+            expired = True
+            Utils.kill_group(p)
+
+        start = time.monotonic()
+        # The tool runs in its own process group, so that a timeout also ends the processes it started
+        p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, start_new_session=True,
+                             env=environment)
+        started = time.monotonic()
+        timer = loop.call_later(timeout, expire) if timeout else None
+        sampler = MemorySampler(p.pid) if psutil is not None else None
+        try:
+            if sampler is not None:
+                sampler.start()
+            await asyncio.gather(capture(p.stdout, "out"), capture(p.stderr, "err"))
+            status, usage = await Runner.wait(p.pid)
+            p.returncode = os.waitstatus_to_exitcode(status)
+            exited = time.monotonic()
+        except BaseException:
+            Utils.kill_group(p)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            for log in logs.values():
+                log.close()
+        wall = (time.monotonic() - start) * 1000
+        peak_rss = usage.ru_maxrss * 1024
+        if sampler is not None:
+            peak_rss = max(peak_rss, sampler.stop())
+        # A tool stopped after its verdict is not a timeout, even if it was killed past the CPU limit
+        # SIGXCPU may come a tick before the usage reaches the limit
+        timed_out = not decided and (expired or (cpu_limit is not None and p.returncode != 0 and (
+                p.returncode == -signal.SIGXCPU or usage.ru_utime + usage.ru_stime >= cpu_limit)))
+        # Without output the whole run counts as startup, without a verdict the tool runs until its last line
+        first = marks["first"] or exited
+        verdict = marks["verdict"] or marks["last"] or exited
+        phases = {"fork": started - start, "startup": first - started, "tool": verdict - first,
+                  "teardown": exited - verdict, "parse": marks["parse"]}
+        return Execution("".join(tails["out"]), "".join(tails["err"]), p.returncode, timed_out, wall,
+                         usage.ru_utime * 1000, usage.ru_stime * 1000, peak_rss / (1 << 20),
+                         Utils.parse_gc_log(gc_log) if gc_log is not None else None, parser,
+                         phases={phase: seconds * 1000 for phase, seconds in phases.items()})
+
+    @staticmethod
+    def open_logs(command, tool, name):
+        os.makedirs(Utils.log_dir, exist_ok=True)
+        digest = hashlib.sha1(command.encode("utf-8")).hexdigest()[:8]
+        prefix = os.path.join(Utils.log_dir, f"{tool}-{os.path.basename(name or tool or 'run')}-{digest}")
+        return {stream: open(f"{prefix}.{stream}", "w") for stream in ["out", "err"]}
+
+    @staticmethod
+    def parse_gc_log(path):
+        total = 0
+        for file in Utils.list_files(path, ".log"):
+            with open(file, "r") as f:
+                for line in f:
+                    match = Utils.re_gc_pause.search(line.rstrip())
+                    if match is not None:
+                        total += float(match[1])
+        shutil.rmtree(path, ignore_errors=True)
+        return total
+
+    @staticmethod
+    def kill_group(p):
+        try:
+            os.killpg(p.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    @staticmethod
+    def run_test(config, test, files, run):
+        result = Utils.journal.lookup(config) if Utils.journal is not None else None
+        if result is not None:
+            Utils.store_result(config, result)
+            return result
+        start = time.monotonic()
+        measured = run
+        if Utils.warmup > 0 or Utils.repeat > 1 or Utils.cpu_slots is not None:
+            run = lambda: Utils.measure(test, measured)
+        if Utils.cache is not None:
+            # Results of repeated runs are cached apart, a single cached run has no spread to report
+            key_config = dict(config, warmup=Utils.warmup, repeat=Utils.repeat) if measured is not run else config
+            result = Utils.cache.run(ResultCache.key(key_config, test, files), run)
+        else:
+            result = run()
+        Utils.record(config, result)
+        if Utils.profiler is not None and getattr(result, "phases", None) is not None:
+            # The harness time of a measured test is shared by its warm-up and measured runs
+            runs = Utils.warmup + len(result.times) if result.times else 1
+            Utils.profiler.add(config, result, (time.monotonic() - start) * 1000 / runs)
+        return result
+
+    @staticmethod
+    def record(config, result):
+        if Utils.journal is not None:
+            Utils.journal.append(config, result)
+        if Utils.cost_model is not None and not result.cached:
+            Utils.cost_model.add(config, result)
+        if Utils.heap_model is not None and not result.cached:
+            Utils.heap_model.add(config, result)
+        Utils.store_result(config, result)
+
+    @staticmethod
+    def store_result(config, result):
+        # Results resumed from the journal also belong to the current run
+        if Utils.store is not None:
+            Utils.store.add(config, result)
+
+    @staticmethod
+    def run_remote(job):
+        # The coordinator keeps the journal of a distributed run, the workers only run the tests
+        config = Utils.job_config(job)
+        result = Utils.journal.lookup(config) if Utils.journal is not None else None
+        if result is not None:
+            Utils.store_result(config, result)
+            return result
+        try:
+            reply = Utils.coordinator.run(job)
+        except WorkerError as e:
+            print(f"{e}, running it on the coordinator")
+            return job()
+        result = Result.from_record(reply["result"])
+        result.cached = reply["cached"]
+        Utils.record(reply["config"], result)
+        return result
+
+    @staticmethod
+    def measure(test, run):
+        # Warm-up runs are discarded, of the measured runs the one with the median time stands for the test and
+        # carries the times of all of them. A run out of memory or time ends the measurement.
+        slot = Utils.cpu_slots.get() if Utils.cpu_slots is not None else None
+        Utils.pinned.cpus = slot
+        try:
+            for _ in range(Utils.warmup):
+                run()
+            results = []
+            for _ in range(Utils.repeat):
+                result = run()
+                if result.time is None:
+                    return result
+                results.append(result)
+        finally:
+            Utils.pinned.cpus = None
+            if slot is not None:
+                Utils.cpu_slots.put(slot)
+        if len(results) == 1:
+            return results[0]
+        verdicts = {getattr(result, "result", None) for result in results}
+        if len(verdicts) > 1:
+            print(f"Verdict of {test} differs between runs: {', '.join(sorted(map(str, verdicts)))}")
+        results.sort(key=lambda result: result.time)
+        result = results[(len(results) - 1) // 2]
+        result.times = [r.time for r in results]
+        stats = result.stats
+        result.time = int(stats.median)
+        if stats.unstable:
+            print(f"Unstable: {test} median {stats.median:.0f} ms, IQR {stats.iqr:.0f} ms over {len(results)} runs")
+        return result
+
+    @staticmethod
+    def pinned_cpus():
+        return getattr(Utils.pinned, "cpus", None)
+
+    @staticmethod
+    def job_config(job):
+        tool = Tool.of(job)
+        return tool.config(*job.args, **job.kwargs) if tool is not None else None
+
+    @staticmethod
+    def predict(job):
+        config = Utils.job_config(job)
+        cost = Utils.cost_model.predict(config) if config is not None else None
+        # A job runs its test once per warm-up and measured run
+        return cost * (Utils.warmup + Utils.repeat) if cost is not None else None
 
     @staticmethod
-    def run_dartagnan_test(test, cat, property, target, bound=1):
-        command = (f"cd {env.DAT3M_HOME} && java -jar dartagnan/target/dartagnan.jar "
-                        f"{test} cat/{cat}.cat --property={property} --target={target} "
-                        f"--bound={bound} --encoding.integers=true --method=assume")
-        start = time.time()
-        out, err = Utils.run_command(command)
-        return Dat3MResult((time.time() - start) * 1000, out, err)
+    def suite(config):
+        # The suite of a test as in the tables: litmus tests by model, GPUVerify kernels, Table 7 and the plots
+        test = config["test"]
+        if config["tool"] == "gpuverify" or "/gpuverify/" in test:
+            return "GPUVerify"
+        if test.startswith(os.path.join(env.BENCHMARKS_DIR, "spirv")):
+            return "Locks"
+        if test.startswith(env.BENCHMARKS_DIR):
+            return "Scaling"
+        if config["tool"] == "alloy-ptx" or config.get("cat") == "ptx-v7.5":
+            return "PTX7.5"
+        if config.get("cat") == "ptx-v6.0":
+            return "PTX6.0"
+        return "Vulkan"
 
     @staticmethod
-    def run_alloy_ptx_test(test):
-        command = f"python3 {os.path.join(env.ALLOY_PTX_HOME, 'src/test_to_alloy.py')} {test}"
-        start = time.time()
-        out, err = Utils.run_command(command)
-        return AlloyPtxResult((time.time() - start) * 1000, out, err)
+    def job(tool, *args, **kwargs):
+        return Tool.registry[tool].job(*args, **kwargs)
 
     @staticmethod
-    def run_alloy_vkn_test(test):
-        command = f"make -j4 -C {env.ALLOY_VKN_HOME} runtests TEST_FILE={test}"
-        start = time.time()
-        out, err = Utils.run_command(command)
-        return AlloyVknResult((time.time() - start) * 1000, out, err)
+    def heap(config):
+        # The heap a run of a java tool starts with, None for the -Xmx of _JAVA_OPTIONS
+        return Utils.heap_model.predict(config) if Utils.heap_model is not None else None
 
     @staticmethod
-    def run_gpuverify_test(test):
-        parts = [os.path.join(env.GPU_VERIFY_HOME, "gpuverify")]
+    def dartagnan_config(test, cat, property, target, bound=1):
+        return {"tool": "dartagnan", "test": test, "cat": cat, "property": property, "target": target, "bound": bound}
+
+    @staticmethod
+    def dartagnan_args(config):
+        return [config["test"], f"cat/{config['cat']}.cat", f"--property={config['property']}",
+                f"--target={config['target']}", f"--bound={config['bound']}", "--encoding.integers=true",
+                "--method=assume"]
+
+    @staticmethod
+    def alloy_ptx_config(test):
+        config = {"tool": "alloy-ptx", "test": test}
+        if Utils.alloy_ptx_workers is not None:
+            # Timings of pooled runs exclude interpreter and grammar startup, keep them apart from per-process runs
+            config["runner"] = "pool"
+        return config
+
+    @staticmethod
+    def alloy_vkn_config(test):
+        config = {"tool": "alloy-vkn", "test": test}
+        if Utils.alloy_vkn_workers is not None:
+            # Timings of batch runs exclude make and JVM startup, keep them apart from per-process runs
+            config["runner"] = "batch"
+        return config
+
+    @staticmethod
+    def prepare_alloy_vkn_test(test):
+        # Runs the commands make would run for the test except RunCommandLine itself and returns its arguments,
+        # the generated .test.gen files, or None if the makefile does not have that shape. Tests are prepared one at
+        # a time, the commands may rebuild prerequisites shared by all tests.
+        with Utils.alloy_vkn_lock:
+            if test not in Utils.alloy_vkn_prepared:
+                dry_run = subprocess.run(["make", "-n", "--no-print-directory", "-C", env.ALLOY_VKN_HOME, "runtests",
+                                          f"TEST_FILE={test}"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         text=True)
+                commands = [line for line in dry_run.stdout.splitlines() if line.strip() and not line.startswith("make")]
+                generated = None
+                if dry_run.returncode == 0 and commands and "RunCommandLine" in commands[-1]:
+                    parts = shlex.split(commands[-1])
+                    generated = parts[parts.index("RunCommandLine") + 1:]
+                    for command in commands[:-1]:
+                        if subprocess.run(command, shell=True, cwd=env.ALLOY_VKN_HOME, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.DEVNULL).returncode != 0:
+                            generated = None
+                            break
+                Utils.alloy_vkn_prepared[test] = generated
+            return Utils.alloy_vkn_prepared[test]
+
+    @staticmethod
+    def prepare_alloy_vkn_tests(tests):
+        if Utils.alloy_vkn_workers is not None:
+            for test in tests:
+                Utils.prepare_alloy_vkn_test(test)
+
+    @staticmethod
+    def alloy_vkn_workers_args(config):
+        if Utils.alloy_vkn_workers is None:
+            return None
+        generated = Utils.prepare_alloy_vkn_test(config["test"])
+        if not generated:
+            print(f"Cannot generate {config['test']} up front, running it in a separate process")
+            return None
+        return Utils.alloy_vkn_workers, generated
+
+    @staticmethod
+    def gpuverify_options(test):
+        # The second line of a GPUVerify test holds its options, e.g. //--local_size=64 --global_size=256
         with open(test, "r") as f:
             f.readline()
-            parts += f.readline().strip().strip("//").split(" ")
-        parts.append(test)
-        command = " ".join(parts)
-        start = time.time()
-        out, err = Utils.run_command(command)
-        return GPUVerifyResult((time.time() - start) * 1000, out, err)
+            return f.readline().strip().strip("//").split(" ")
+
+    @staticmethod
+    def tests(group):
+        # The tests of a declared group: the first column of a list of expected results of dartagnan ("expected"), the
+        # files with an extension in a directory ("files") or those listed by a function ("tests")
+        if "expected" in group:
+            with open(os.path.join(env.DAT3M_HOME, "dartagnan/src/test/resources", group["expected"]), "r") as f:
+                return [line.split(",")[0] for line in (line.rstrip() for line in f) if line]
+        if "files" in group:
+            return Utils.list_files(*group["files"])
+        return group["tests"]()
+
+    @staticmethod
+    def jobs(groups):
+        # Every test of a group is run by its tool with the arguments of the group ("args")
+        return {name: [Utils.job(group["tool"], test, *group.get("args", [])) for test in Utils.tests(group)]
+                for name, group in groups.items()}
+
+    @staticmethod
+    def run_jobs(groups, stop=None):
+        results = Utils.executor.run(groups, stop)
+        total = sum([r.time for rs in results.values() for r in rs if r.time is not None])
+        cached = sum([r.cached for rs in results.values() for r in rs])
+        print(f"Ran {sum([len(rs) for rs in results.values()])} tests ({cached} reused) on {Utils.executor.jobs} jobs: "
+              f"wall-clock time {Utils.executor.wall:.0f} ms, summed per-test time {total:.0f} ms")
+        if Utils.cost_model is not None:
+            # Only the tests that actually ran count, reused results take no time
+            ran = [Utils.executor.predicted[(name, i)] for name, rs in results.items()
+                   for i, r in enumerate(rs) if not r.cached]
+            known = [cost for cost in ran if cost is not None]
+            if known:
+                print(f"Predicted makespan {Utils.executor.makespan(known):.0f} ms for {len(known)} of {len(ran)} "
+                      f"tests run, actual wall-clock time {Utils.executor.wall:.0f} ms")
+        if Utils.repeat > 1:
+            measured = [r for rs in results.values() for r in rs if r.stats is not None]
+            unstable = sum([r.stats.unstable for r in measured])
+            print(f"{unstable} of {len(measured)} tests measured {Utils.repeat} times are unstable "
+                  f"(interquartile range above {Stats.threshold:.0%} of the median, marked with *)")
+        return results
+
+    @staticmethod
+    def total_time(results):
+        return sum([result.time for result in results if result.time is not None])
+
+    @staticmethod
+    def total_stats(results):
+        # Totals of the k-th measured runs of all tests, or None unless every completed test was measured repeatedly
+        completed = [result for result in results if result.time is not None]
+        if not completed or any([result.stats is None for result in completed]):
+            return None
+        runs = min([len(result.times) for result in completed])
+        return Stats([sum([result.times[k] for result in completed]) for k in range(runs)])
+
+    @staticmethod
+    def format_time(time, stats=None):
+        if stats is not None:
+            return str(stats)
+        return f"{time:.0f}" if time is not None else "-"
+
+    @staticmethod
+    def total_cpu(results):
+        return sum([result.cpu_time for result in results if result.cpu_time is not None])
+
+    @staticmethod
+    def peak_rss(results):
+        return max([result.peak_rss for result in results if result.peak_rss is not None], default=0)
+
+    @staticmethod
+    def print_times(name, summary):
+        print(f"{name}: {summary['completed']} runs, {summary['tests'] - summary['completed']} out of memory or time, "
+              f"wall time {summary['time']:.0f} ms, verification time {summary['parsed_time']:.0f} ms")
 
     @staticmethod
     def print_table(filename, table):
+        # Imported only to print a table
+        from tabulate import tabulate
         print(tabulate(table[1:], headers=table[0]))
         os.makedirs(env.OUTPUT_DIR, exist_ok=True)
         path = os.path.join(env.OUTPUT_DIR, filename)
         with open(path, "w") as f:
             csv.writer(f).writerows(table)
         print(f"Table written to {path}")
+
+
+# The tools of the tables and plots, see Tool
+Tool("dartagnan", Dat3MResult, Utils.dartagnan_config,
+     lambda config: [os.path.join(env.DAT3M_HOME, "dartagnan/target/dartagnan.jar"),
+                     os.path.join(env.DAT3M_HOME, f"cat/{config['cat']}.cat")],
+     lambda config: ["java", "-jar", "dartagnan/target/dartagnan.jar"] + Utils.dartagnan_args(config),
+     cwd=env.DAT3M_HOME, path=lambda test: os.path.join(env.DAT3M_HOME, test), java=True,
+     workers=lambda config: (Utils.dartagnan_workers, Utils.dartagnan_args(config))
+     if Utils.dartagnan_workers is not None else None)
+Tool("alloy-ptx", AlloyPtxResult, Utils.alloy_ptx_config,
+     lambda config: (Utils.list_files(os.path.join(env.ALLOY_PTX_HOME, "src"), ".py") +
+                     Utils.list_files(env.ALLOY_PTX_HOME, ".als")),
+     lambda config: ["python3", os.path.join(env.ALLOY_PTX_HOME, "src/test_to_alloy.py"), config["test"]], java=True,
+     workers=lambda config: (Utils.alloy_ptx_workers, [config["test"]])
+     if Utils.alloy_ptx_workers is not None else None)
+Tool("alloy-vkn", AlloyVknResult, Utils.alloy_vkn_config,
+     lambda config: Utils.list_files(env.ALLOY_VKN_HOME, ".als") + Utils.list_files(env.ALLOY_VKN_HOME, ".jar"),
+     lambda config: ["make", "-j4", "-C", env.ALLOY_VKN_HOME, "runtests", f"TEST_FILE={config['test']}"], java=True,
+     workers=Utils.alloy_vkn_workers_args)
+Tool("gpuverify", GPUVerifyResult, lambda test: {"tool": "gpuverify", "test": test},
+     lambda config: [os.path.join(env.GPU_VERIFY_HOME, "gpuverify"),
+                     os.path.join(env.GPU_VERIFY_HOME, "GPUVerify.py")],
+     lambda config: ([os.path.join(env.GPU_VERIFY_HOME, "gpuverify")] +
+                     [option for option in Utils.gpuverify_options(config["test"]) if option] + [config["test"]]))
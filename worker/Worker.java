@@ -0,0 +1,93 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+
+// Long-lived JVM that runs the main method of a tool class once per job.
+// Jobs are read from stdin, one per line, with arguments separated by tabs.
+// For every job the worker writes a header line
+//   @@WORKER <status> <millis> <stdout-bytes> <stderr-bytes>
+// followed by the captured stdout and stderr of the job.
+public class Worker {
+    private static final String HEADER = "@@WORKER";
+
+    private static class Redirect extends OutputStream {
+        private volatile OutputStream target;
+
+        Redirect(OutputStream target) {
+            this.target = target;
+        }
+
+        void setTarget(OutputStream target) {
+            this.target = target;
+        }
+
+        @Override
+        public void write(int b) throws IOException {
+            target.write(b);
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) throws IOException {
+            target.write(b, off, len);
+        }
+
+        @Override
+        public void flush() throws IOException {
+            target.flush();
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        PrintStream channel = new PrintStream(new FileOutputStream(FileDescriptor.out), false, StandardCharsets.UTF_8);
+        // Tools may capture System.out/err during class initialization (e.g. logging appenders),
+        // so both streams are replaced before the tool class is loaded and only retargeted per job.
+        Redirect out = new Redirect(OutputStream.nullOutputStream());
+        Redirect err = new Redirect(OutputStream.nullOutputStream());
+        System.setOut(new PrintStream(out, true, StandardCharsets.UTF_8));
+        System.setErr(new PrintStream(err, true, StandardCharsets.UTF_8));
+
+        Method entry = Class.forName(args[0]).getMethod("main", String[].class);
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            ByteArrayOutputStream jobOut = new ByteArrayOutputStream();
+            ByteArrayOutputStream jobErr = new ByteArrayOutputStream();
+            out.setTarget(jobOut);
+            err.setTarget(jobErr);
+            int status = 0;
+            long start = System.nanoTime();
+            try {
+                entry.invoke(null, (Object) line.split("\t"));
+            } catch (InvocationTargetException e) {
+                e.getCause().printStackTrace();
+                status = 1;
+            } catch (Throwable e) {
+                e.printStackTrace();
+                status = 1;
+            } finally {
+                System.out.flush();
+                System.err.flush();
+                out.setTarget(OutputStream.nullOutputStream());
+                err.setTarget(OutputStream.nullOutputStream());
+            }
+            long millis = (System.nanoTime() - start) / 1_000_000;
+            byte[] stdout = jobOut.toByteArray();
+            byte[] stderr = jobErr.toByteArray();
+            channel.print(HEADER + " " + status + " " + millis + " " + stdout.length + " " + stderr.length + "\n");
+            channel.write(stdout);
+            channel.write(stderr);
+            channel.flush();
+        }
+    }
+}